@@ -1,7 +1,20 @@
 from django.contrib import admin
 
 from .models import About, AllRequest, SignalData
+from .models import RequestMinuteStat, RequestHourStat, PriorityRule
+from .models import ImageRendition
 
 admin.site.register(About)
 admin.site.register(SignalData)
 admin.site.register(AllRequest)
+admin.site.register(RequestMinuteStat)
+admin.site.register(RequestHourStat)
+admin.site.register(ImageRendition)
+
+
+class PriorityRuleAdmin(admin.ModelAdmin):
+    list_display = ('order', 'method', 'path', 'priority')
+    list_editable = ('method', 'path', 'priority')
+
+
+admin.site.register(PriorityRule, PriorityRuleAdmin)
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import RequestMinuteStat, RequestHourStat
+from .retention import rollup
+
+RESOLUTIONS = {
+    'minute': RequestMinuteStat,
+    'hour': RequestHourStat,
+}
+
+GROUPS = ('method', 'path', 'priority')
+
+
+def count_requests(rows):
+    """ Add AllRequest rows about to be written to the stat tables
+
+    The request writer calls it in the transaction that inserts them, so
+    rows are marked counted exactly when their stats are committed too.
+    """
+    rollup([(row.pk, row.date, row.method, row.path, row.priority)
+            for row in rows])
+    for row in rows:
+        row.counted = True
+
+
+def stat_model(start, end):
+    """ Minute stats for short recent ranges, hour stats for the others
+
+    Minute stats are only kept for REQUEST_STATS_MINUTE_DAYS days.
+    """
+    limit = getattr(settings, 'REQUEST_ANALYTICS_MINUTE_RANGE', 24 * 60)
+    kept = getattr(settings, 'REQUEST_STATS_MINUTE_DAYS', 7)
+    if end - start <= timedelta(minutes=limit) and \
+            start >= timezone.now() - timedelta(days=kept):
+        return RequestMinuteStat
+    return RequestHourStat
+
+
+def time_range(minutes, end=None):
+    end = end or timezone.now()
+    return end - timedelta(minutes=minutes), end
+
+
+def top(field, start, end, limit=10):
+    """ The ``limit`` values of ``field`` with the most requests """
+    stats = stat_model(start, end).objects.filter(start__gte=start,
+                                                  start__lt=end)
+    return [(row[field], row['total']) for row in
+            stats.values(field).annotate(total=Sum('count'))
+                 .order_by('-total', field)[:limit]]
+
+
+def series(start, end, resolution='minute', group=None):
+    """ Requests per time bucket, optionally split by ``group`` """
+    fields = ['start'] + ([group] if group else [])
+    stats = RESOLUTIONS[resolution].objects.filter(start__gte=start,
+                                                   start__lt=end)
+    return [dict(row, start=row['start'].isoformat()) for row in
+            stats.values(*fields).annotate(total=Sum('count'))
+                 .order_by(*fields)]
@@ -0,0 +1,108 @@
+from django.db import transaction
+from django.db.models import Q
+
+from . import feed
+from . import signals as audit
+from .models import AllRequest
+
+
+# Stay below SQLite's limit of 999 parameters per statement
+IDS_PER_UPDATE = 900
+
+# Ids named in the audit row of a bulk change
+IDS_DESCRIBED = 5
+
+
+def request_filter(path=None, method=None):
+    """ Q of the requests made to ``path`` with ``method``
+
+    ``path`` is a prefix, or a regular expression when it starts with
+    ``^``, as in REQUEST_LOG_EXCLUDE and priority rules. Prefixes are a
+    range of paths, compared case sensitively as PriorityRules does:
+    startswith is a case insensitive LIKE on SQLite, and a regex there
+    calls back into Python for every row.
+    """
+    q = Q()
+    if path:
+        if path.startswith('^'):
+            q &= Q(path__regex=path)
+        else:
+            q &= Q(path__gte=path, path__lt=path + u'\uffff')
+    if method:
+        q &= Q(method=method.upper())
+    return q
+
+
+def matching(ids=None, path=None, method=None):
+    """ Querysets of the requests to change, one per UPDATE to run """
+    requests = AllRequest.objects.filter(request_filter(path, method))
+    if ids is None:
+        return [requests]
+    ids = sorted(set(ids))
+    return [requests.filter(pk__in=ids[start:start + IDS_PER_UPDATE])
+            for start in range(0, len(ids), IDS_PER_UPDATE)]
+
+
+def describe(ids=None, path=None, method=None):
+    """ The requests matching ``ids``, ``path`` and ``method`` in words """
+    parts = []
+    if ids is not None:
+        ids = sorted(set(ids))
+        more = ', ...' if len(ids) > IDS_DESCRIBED else ''
+        parts.append('id is one of %d ids (%s%s)' % (
+            len(ids), ', '.join(map(unicode, ids[:IDS_DESCRIBED])), more))
+    if path:
+        parts.append("path %s '%s'" % (
+            'matches' if path.startswith('^') else 'starts with', path))
+    if method:
+        parts.append("method is '%s'" % method.upper())
+    return ' and '.join(parts) or 'any request'
+
+
+def set_priority(priority, ids=None, path=None, method=None):
+    """ Give ``priority`` to the matching requests, return how many changed
+
+    The matching rows are changed by one UPDATE (per IDS_PER_UPDATE ids)
+    instead of a save() each, so no post_save is sent. If AllRequest is
+    audited one SignalData row records the whole change, with what was
+    matched and how many rows changed.
+    """
+    changed = 0
+    with transaction.atomic():
+        for requests in matching(ids, path, method):
+            changed += requests.exclude(priority=priority).update(
+                priority=priority)
+    if changed:
+        if audit.is_registered(AllRequest):
+            audit.audit_bulk('Update', AllRequest, changed, '%s, priority '
+                             '%d' % (describe(ids, path, method), priority))
+        feed.requests_changed()
+    return changed
+
+
+def apply_rules(rules):
+    """ Give stored requests the priority of the first rule they match
+
+    ``rules`` are (path, method, priority) tuples as in PriorityRules.
+    Each rule is one UPDATE of the rows it matches that no earlier rule
+    matches, so every row is written at most once. Like compaction this
+    is not audited. Returns the number of rows changed by every rule.
+    """
+    counts = []
+    # what the rules so far match, empty once one of them matches all
+    matched = None
+    with transaction.atomic():
+        for path, method, priority in rules:
+            if matched is not None and not matched:
+                counts.append(0)
+                continue
+            q = request_filter(path, method)
+            requests = AllRequest.objects.filter(q).exclude(
+                priority=priority)
+            if matched is not None:
+                requests = requests.exclude(matched)
+            counts.append(requests.update(priority=priority))
+            matched = q if matched is None or not q else matched | q
+    if any(counts):
+        feed.requests_changed()
+    return counts
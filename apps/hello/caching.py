@@ -0,0 +1,125 @@
+import hashlib
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import get_cache
+from django.db.models import signals
+from django.db.models.loading import get_model
+
+
+_stores = threading.local()
+
+
+def cache_backend(name):
+    """ The ``name`` cache backend of this thread, created once
+
+    get_cache() builds a new backend, and a new client for memcached,
+    every time it is called, and connects one more request_finished
+    receiver for it.
+    """
+    stores = _stores.__dict__
+    store = stores.get(name)
+    if store is None:
+        store = stores[name] = get_cache(name)
+    return store
+
+
+def _generation_key(model):
+    return 'hello:generation:%s' % model._meta.db_table
+
+
+def _backends():
+    return sorted(set([
+        getattr(settings, 'VIEW_CACHE_BACKEND', 'default'),
+        getattr(settings, 'FRAGMENT_CACHE_BACKEND', 'default')]))
+
+
+def generations(models, store):
+    """ Current generation of every model in ``models``
+
+    A generation is a counter bumped on every save and delete of the
+    model, so keys built from it stop matching as soon as something they
+    depend on changes. It is kept in ``store``, the backend of the cached
+    entries, so every process sharing the entries sees the change.
+    """
+    keys = [_generation_key(model) for model in models]
+    values = store.get_many(keys)
+    for key in keys:
+        if key not in values:
+            store.add(key, 1, None)
+            values[key] = store.get(key, 1)
+    return [values[key] for key in keys]
+
+
+def invalidate(sender, **kwargs):
+    """ Bump the generation of ``sender`` in every view and fragment
+    cache backend """
+    key = _generation_key(sender)
+    for name in _backends():
+        store = cache_backend(name)
+        try:
+            store.incr(key)
+        except ValueError:
+            store.set(key, 2, None)
+
+
+def depend_on(*models):
+    """ Resolve 'app.Model' labels and watch the models for changes """
+    resolved = []
+    for model in models:
+        if isinstance(model, basestring):
+            model = get_model(*model.split('.'))
+        uid = 'cache-%s' % model._meta.db_table
+        signals.post_save.connect(invalidate, sender=model, dispatch_uid=uid)
+        signals.post_delete.connect(invalidate, sender=model,
+                                    dispatch_uid=uid)
+        resolved.append(model)
+    return resolved
+
+
+def make_key(prefix, models, parts, store):
+    parts = [prefix] + generations(models, store) + list(parts)
+    digest = hashlib.md5(u':'.join(map(unicode, parts)).encode('utf-8'))
+    return 'hello:cache:%s:%s' % (prefix, digest.hexdigest())
+
+
+def cache_view(*models, **options):
+    """ Cache a view until one of ``models`` is saved or deleted
+
+    Responses to GET and HEAD requests are cached per full path and user in
+    the ``cache`` backend (VIEW_CACHE_BACKEND unless given) for ``timeout``
+    seconds (the backend's default unless given)::
+
+        @cache_view(About, timeout=600)
+        def all_people(request):
+            ...
+    """
+    timeout = options.get('timeout')
+    backend = options.get('cache', getattr(settings, 'VIEW_CACHE_BACKEND',
+                                           'default'))
+
+    def decorator(view):
+        prefix = '%s.%s' % (view.__module__, view.__name__)
+        watched = depend_on(*models)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            store = cache_backend(backend)
+            user = request.user.pk if request.user.is_authenticated() else 0
+            key = make_key(prefix, watched, [request.get_full_path(), user],
+                           store)
+            response = store.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and \
+                        not response.streaming:
+                    if timeout is None:
+                        store.set(key, response)
+                    else:
+                        store.set(key, response, timeout)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,158 @@
+from multiprocessing.pool import ThreadPool
+
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F, signals
+from django.db.models.loading import get_model
+
+
+_tracked = set()
+
+
+def _counters():
+    # models.py imports this module, so RowCounter is looked up when used:
+    # an import here fails when this module is imported first
+    return get_model('hello', 'RowCounter')._default_manager
+
+
+def track(*models):
+    """ Keep the row count of ``models`` in RowCounter
+
+    Saves and deletes change the counter in their own transaction. Code
+    that inserts or deletes rows without signals, bulk_create or raw SQL,
+    has to call add() itself.
+    """
+    for model in models:
+        uid = 'count-%s' % model._meta.db_table
+        signals.post_save.connect(_saved, sender=model, dispatch_uid=uid)
+        signals.post_delete.connect(_deleted, sender=model, dispatch_uid=uid)
+        _tracked.add(model)
+
+
+def is_tracked(model):
+    return model in _tracked
+
+
+def _saved(sender, created, **kwargs):
+    add(sender, 1 if created else 0)
+
+
+def _deleted(sender, **kwargs):
+    add(sender, -1)
+
+
+def add(model, number):
+    """ Change the counter of ``model`` by ``number`` rows """
+    if number and model in _tracked:
+        # a missing counter is created with a real count when first read
+        _counters().filter(table=model._meta.db_table).update(
+            count=F('count') + number)
+
+
+def row_count(model):
+    """ Rows in the table of ``model``, without COUNT(*) if it is tracked """
+    if model not in _tracked:
+        return model._default_manager.count()
+    table = model._meta.db_table
+    counter = _counters().filter(table=table).values_list('count',
+                                                          flat=True)
+    if counter:
+        return counter[0]
+    return reset(model)
+
+
+def reset(model):
+    """ Set the counter of ``model`` from a COUNT(*) """
+    table = model._meta.db_table
+    with transaction.atomic():
+        count = model._default_manager.count()
+        if not _counters().filter(table=table).update(count=count):
+            try:
+                with transaction.atomic():
+                    _counters().create(table=table, count=count)
+            except IntegrityError:
+                _counters().filter(table=table).update(count=count)
+    return count
+
+
+def _count(model):
+    try:
+        return row_count(model)
+    finally:
+        # every pool thread opened its own connection
+        connections[model._default_manager.db].close()
+
+
+def exact_counts(models, threads=1, using='default'):
+    """ {model: row count} of every model, ``threads`` at a time
+
+    Tracked models are read from their counter, the others are counted.
+
+    SQLite serializes readers of one connection and in-memory databases
+    are not shared between threads, so there the counts run one by one.
+    """
+    models = list(models)
+    if threads <= 1 or len(models) < 2 or \
+            connections[using].vendor == 'sqlite':
+        return dict((model, row_count(model)) for model in models)
+    pool = ThreadPool(min(threads, len(models)))
+    try:
+        return dict(zip(models, pool.map(_count, models)))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _sqlite_estimates(cursor, tables):
+    # sqlite_stat1 exists once ANALYZE has been run, its stat column
+    # starts with the row count of the table
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                   "AND name = 'sqlite_stat1'")
+    if cursor.fetchone() is None:
+        return {}
+    cursor.execute('SELECT tbl, stat FROM sqlite_stat1')
+    estimates = {}
+    for table, stat in cursor.fetchall():
+        if table in tables and stat:
+            rows = int(stat.split()[0])
+            estimates[table] = max(rows, estimates.get(table, 0))
+    return estimates
+
+
+def _postgresql_estimates(cursor, tables):
+    cursor.execute('SELECT relname, reltuples FROM pg_class '
+                   "WHERE relkind = 'r' AND relname IN %s", [tuple(tables)])
+    return dict((table, int(rows)) for table, rows in cursor.fetchall()
+                if rows >= 0)
+
+
+def _mysql_estimates(cursor, tables):
+    cursor.execute('SELECT table_name, table_rows FROM '
+                   'information_schema.tables WHERE table_schema = '
+                   'DATABASE() AND table_name IN %s', [tuple(tables)])
+    return dict((table, int(rows)) for table, rows in cursor.fetchall()
+                if rows is not None)
+
+
+ESTIMATES = {
+    'sqlite': _sqlite_estimates,
+    'postgresql': _postgresql_estimates,
+    'mysql': _mysql_estimates,
+}
+
+
+def estimated_counts(models, using='default'):
+    """ {model: approximate row count} from the table statistics
+
+    Models the statistics know nothing about are left out.
+    """
+    models = list(models)
+    connection = connections[using]
+    estimate = ESTIMATES.get(connection.vendor)
+    if estimate is None or not models:
+        return {}
+    tables = dict((model._meta.db_table, model) for model in models)
+    try:
+        rows = estimate(connection.cursor(), tables)
+    except DatabaseError:
+        return {}
+    return dict((tables[table], count) for table, count in rows.items())
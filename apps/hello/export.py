@@ -0,0 +1,108 @@
+import csv
+import json
+from datetime import datetime, time
+
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import AllRequest
+
+
+FIELDS = ('id', 'date', 'method', 'path', 'priority')
+
+
+def parse_when(value, end=False):
+    """ A date or datetime string as an aware datetime
+
+    A plain date stands for the start of that day, or its end for ``end``.
+    """
+    when = parse_datetime(value)
+    if when is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError('%r is not a date' % value)
+        when = datetime.combine(day, time.max if end else time.min)
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when, timezone.get_current_timezone())
+    return when
+
+
+def parse_filters(data):
+    """ Keyword arguments for export_queryset from GET data or options """
+    filters = {}
+    for name, end in (('start', False), ('end', True)):
+        if data.get(name):
+            filters[name] = parse_when(data[name], end)
+    for name in ('priority', 'min_priority'):
+        if data.get(name) not in (None, ''):
+            filters[name] = int(data[name])
+    return filters
+
+
+def export_queryset(start=None, end=None, priority=None, min_priority=None):
+    requests = AllRequest.objects.all()
+    if start is not None:
+        requests = requests.filter(date__gte=start)
+    if end is not None:
+        requests = requests.filter(date__lte=end)
+    if priority is not None:
+        requests = requests.filter(priority=priority)
+    if min_priority is not None:
+        requests = requests.filter(priority__gte=min_priority)
+    return requests
+
+
+def iter_rows(requests, chunk_size=2000):
+    """ (id, date, method, path, priority) of ``requests`` in id order
+
+    Rows are read ``chunk_size`` at a time, each chunk starting after the
+    last id of the one before, so memory use doesn't grow with the table.
+    The id range is looked up once through the date and priority indexes
+    so a narrow filter doesn't walk the whole table.
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1, not %r'
+                         % chunk_size)
+    bounds = requests.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+    last = bounds['low'] - 1
+    requests = requests.filter(pk__lte=bounds['high']).order_by('pk')
+    while True:
+        chunk = requests.filter(pk__gt=last).values_list(*FIELDS)
+        count = 0
+        for row in chunk[:chunk_size].iterator():
+            count += 1
+            last = row[0]
+            yield row
+        if count < chunk_size:
+            return
+
+
+class Echo(object):
+    """ File-like object csv.writer writes a line at a time into """
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow([
+            row[0], row[1].isoformat() if row[1] else '',
+            row[2].encode('utf-8'), row[3].encode('utf-8'), row[4]])
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        data = dict(zip(FIELDS, row))
+        data['date'] = row[1].isoformat() if row[1] else None
+        yield json.dumps(data) + '\n'
+
+
+FORMATS = {
+    'csv': (csv_lines, 'text/csv'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+}
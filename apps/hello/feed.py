@@ -0,0 +1,168 @@
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db.models import signals
+
+from .caching import cache_backend, invalidate
+from .models import AllRequest
+
+
+VERSION_KEY = 'hello:feed:changes'
+
+
+def _store():
+    return cache_backend(getattr(settings, 'VIEW_CACHE_BACKEND', 'default'))
+
+
+def version():
+    """ Counter of the changes to AllRequest rows
+
+    It lives in VIEW_CACHE_BACKEND, next to the generations of cached
+    views, so every process sharing that backend sees the changes of the
+    others, and answering "did anything change" never touches the
+    AllRequest table.
+    """
+    value = _store().get(VERSION_KEY)
+    if value is None:
+        value = touch()
+    return value
+
+
+def touch(*args, **kwargs):
+    """ Count a change, return the new version """
+    store = _store()
+    # a counter dropped from the cache starts again from the clock, not
+    # from a version some process may still remember. Not add(): locmem
+    # overwrites keys without expiry with it
+    if store.get(VERSION_KEY) is None:
+        store.set(VERSION_KEY, int(time.time() * 1000), None)
+    try:
+        return store.incr(VERSION_KEY)
+    except ValueError:
+        # dropped again between get and incr
+        value = int(time.time() * 1000)
+        store.set(VERSION_KEY, value, None)
+        return value
+
+
+class RequestFeed(object):
+    """ Ring buffer and publish/subscribe of the newest AllRequest rows
+
+    The request writer publishes every batch it stores, so once the
+    buffer has been filled from the database it holds the newest ``size``
+    rows and the "last requests" views are answered from memory. Every
+    read compares the version the buffer was filled at with the shared
+    one, so rows recorded by other processes, and saves and deletes
+    through the ORM, a priority edit for example, make the next read
+    load it again.
+
+    Long-poll views wait here for rows newer than the last id their
+    client has seen. Batches of this process wake them straight away,
+    those of other processes within ``check_interval`` seconds.
+    """
+
+    def __init__(self, size, check_interval=1):
+        self.check_interval = check_interval
+        self._rows = deque(maxlen=size)
+        self._condition = threading.Condition()
+        self._warm = False
+        self._complete = False
+        self._version = None
+
+    def publish(self, rows):
+        if not rows:
+            return
+        known = sorted((row for row in rows if row.pk is not None),
+                       key=lambda row: row.pk)
+        with self._condition:
+            # Unless this batch is the only change since the buffer was
+            # in sync, other processes changed rows it doesn't have.
+            # Rows without ids, from backends the writer can't read the
+            # ids of a bulk insert on, have to be read from the database.
+            # Ids only grow, unless the table was emptied or rolled back,
+            # then what we remember is no longer there
+            current = touch()
+            if self._version is None or current != self._version + 1 or \
+                    len(known) < len(rows) or \
+                    self._rows and self._rows[-1].pk >= known[0].pk:
+                self._warm = False
+            if self._warm:
+                self._rows.extend(known)
+                self._complete = self._complete and (
+                    len(self._rows) < self._rows.maxlen)
+                self._version = current
+            self._condition.notify_all()
+
+    def invalidate(self, *args, **kwargs):
+        with self._condition:
+            self._warm = False
+
+    def latest(self, count):
+        """ The newest ``count`` rows, newest first """
+        with self._condition:
+            self._warm_up()
+            return list(reversed(self._rows))[:count]
+
+    def since(self, pk):
+        """ Rows newer than ``pk``, newest first
+
+        None means the buffer doesn't reach back to ``pk`` and the caller
+        has to ask the database.
+        """
+        with self._condition:
+            self._warm_up()
+            if self._rows and not self._complete and \
+                    self._rows[0].pk > pk + 1:
+                return None
+            return [row for row in reversed(self._rows) if row.pk > pk]
+
+    def _warm_up(self):
+        # read before the rows, so a change made meanwhile is seen next time
+        current = version()
+        if self._warm and current == self._version:
+            return
+        size = self._rows.maxlen
+        rows = list(AllRequest.objects.order_by('-id')[:size])
+        self._rows.clear()
+        self._rows.extend(reversed(rows))
+        self._complete = len(rows) < size
+        self._version = current
+        self._warm = True
+
+    def wait(self, pk, timeout):
+        """ Block up to ``timeout`` seconds until there are rows after pk """
+        deadline = time.time() + timeout
+        with self._condition:
+            while True:
+                rows = self.since(pk)
+                if rows is None or rows:
+                    return rows
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return []
+                self._condition.wait(min(remaining, self.check_interval))
+
+
+request_feed = RequestFeed(
+    getattr(settings, 'REQUEST_FEED_SIZE', 100),
+    getattr(settings, 'REQUEST_FEED_CHECK_INTERVAL', 1))
+
+
+def requests_changed():
+    """ Tell the feed, its version and cached views about AllRequest rows
+    changed without signals, by bulk UPDATEs, inserts or deletes """
+    request_feed.invalidate()
+    touch()
+    invalidate(AllRequest)
+
+
+signals.post_save.connect(touch, sender=AllRequest,
+                          dispatch_uid='feed-version-save')
+signals.post_delete.connect(touch, sender=AllRequest,
+                            dispatch_uid='feed-version-delete')
+signals.post_save.connect(request_feed.invalidate, sender=AllRequest,
+                          dispatch_uid='feed-invalidate-save')
+signals.post_delete.connect(request_feed.invalidate, sender=AllRequest,
+                            dispatch_uid='feed-invalidate-delete')
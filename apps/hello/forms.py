@@ -1,6 +1,6 @@
+import re
+
 from django import forms
-from imagekit.forms import ProcessedImageField
-from imagekit.processors import ResizeToFill
 
 from .widgets import DateWidget
 from .models import About, AllRequest
@@ -8,10 +8,8 @@ from .models import About, AllRequest
 
 class EditPersonForm(forms.ModelForm):
     date = forms.DateField(widget=DateWidget(attrs={'class': 'datepicker'}))
-    image = ProcessedImageField(spec_id='hello:about:image',
-                                processors=[ResizeToFill(200, 200)],
-                                format='JPEG',
-                                options={'quality': 90})
+    # stored as uploaded, images.process() renders the sizes shown
+    image = forms.ImageField()
 
     class Meta:
         model = About
@@ -21,3 +19,38 @@ class EditRequestForm(forms.ModelForm):
     class Meta:
         model = AllRequest
         exclude = ('req', 'date', 'method', 'path')
+
+
+class BulkPriorityForm(forms.Form):
+    priority = forms.IntegerField(
+        validators=AllRequest._meta.get_field('priority').validators)
+    ids = forms.CharField(required=False)
+    path = forms.CharField(required=False, max_length=200)
+    method = forms.CharField(required=False, max_length=50)
+
+    def clean_ids(self):
+        ids = self.cleaned_data['ids']
+        if not ids:
+            return None
+        try:
+            return [int(pk) for pk in ids.split(',') if pk.strip()]
+        except ValueError:
+            raise forms.ValidationError('Enter request ids separated by '
+                                        'commas')
+
+    def clean_path(self):
+        path = self.cleaned_data['path']
+        if path.startswith('^'):
+            try:
+                re.compile(path)
+            except re.error:
+                raise forms.ValidationError('Enter a valid regular '
+                                            'expression')
+        return path
+
+    def clean(self):
+        data = self.cleaned_data
+        if not (data.get('ids') or data.get('path') or data.get('method')):
+            raise forms.ValidationError('Choose requests by id, path or '
+                                        'method')
+        return data
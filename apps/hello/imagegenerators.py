@@ -0,0 +1,30 @@
+from django.conf import settings
+from imagekit import ImageSpec, register
+from imagekit.processors import ResizeToFill, Transpose
+
+from .images import OPTIONS, rendition_formats, rendition_sizes, spec_id
+
+
+class ProfileImage(ImageSpec):
+    """ Square profile photo ``width`` pixels wide """
+    width = 200
+    format = 'JPEG'
+
+    @property
+    def processors(self):
+        return [Transpose(Transpose.AUTO),
+                ResizeToFill(self.width, self.width)]
+
+    @property
+    def options(self):
+        return dict(OPTIONS.get(self.format, {}),
+                    quality=getattr(settings, 'PROFILE_IMAGE_QUALITY', 90))
+
+
+register.generator('hello:about:image', ProfileImage)
+
+for width in rendition_sizes():
+    for format in rendition_formats():
+        register.generator(spec_id(width, format), type(
+            'ProfileImage%d%s' % (width, format), (ProfileImage,),
+            {'width': width, 'format': format}))
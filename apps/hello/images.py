@@ -0,0 +1,208 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from StringIO import StringIO
+
+from PIL import Image
+from pilkit.processors import ProcessorPipeline, ResizeToFill, Transpose
+from pilkit.utils import save_image
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from .models import About, ImageRendition
+
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp', 'PNG': 'png'}
+
+OPTIONS = {
+    'JPEG': {'progressive': True, 'optimize': True},
+    'WEBP': {'method': 4},
+}
+
+
+def rendition_sizes():
+    return getattr(settings, 'PROFILE_IMAGE_SIZES', (200, 400, 800))
+
+
+def rendition_formats():
+    """ Configured formats this Pillow build can write """
+    Image.init()
+    return [name for name in getattr(settings, 'PROFILE_IMAGE_FORMATS',
+                                     ('JPEG', 'WEBP'))
+            if name in Image.SAVE]
+
+
+def spec_id(width, format):
+    """ Id of the imagekit spec for one rendition, see imagegenerators """
+    return 'hello:about:image:%d:%s' % (width, format.lower())
+
+
+def generated_sources(source):
+    """ [(format, [(width, url)])] of imagekit renditions of ``source``
+
+    The files are generated the first time they are asked for and named
+    after a hash of the source and spec, so later calls find them in the
+    cache file backend without touching the image.
+    """
+    from imagekit.cachefiles import ImageCacheFile
+    from imagekit.registry import generator_registry
+
+    sizes = sorted(rendition_sizes())
+    sizes = [size for size in sizes
+             if size <= min(source.width, source.height)] or sizes[:1]
+    return [(format, [(size, ImageCacheFile(generator_registry.get(
+        spec_id(size, format), source=source)).url) for size in sizes])
+        for format in rendition_formats()]
+
+
+def image_sources(person):
+    """ [(format, [(width, url)])] to build the srcsets of ``person``
+
+    Renditions made by the workers are used when there are any. While
+    they are being made the upload is shown as it is; images uploaded
+    before the workers existed get imagekit renditions made on demand.
+    """
+    renditions = {}
+    for rendition in person.renditions.all():
+        renditions.setdefault(rendition.format, []).append(
+            (rendition.width, rendition.image.url))
+    sources = renditions.items()
+    if not sources and person.image_original:
+        return [('JPEG', [(None, person.image.url)])]
+    if not sources:
+        try:
+            sources = generated_sources(person.image)
+        except (IOError, OSError):
+            logger.exception('Could not make renditions of %s',
+                             person.image.name)
+            return [('JPEG', [(None, person.image.url)])]
+    # JPEG first, every browser can show it
+    return sorted(sources, key=lambda item: item[0] != 'JPEG')
+
+
+def render(name, sizes, formats, quality):
+    """ Write square renditions of the stored image ``name``
+
+    Runs in a worker process, so it only touches the storage, never the
+    database. Returns [(width, format, stored name)], or None when the
+    image could not be processed.
+    """
+    try:
+        with default_storage.open(name) as original:
+            image = Image.open(original)
+            image.load()
+        base = os.path.splitext(os.path.basename(name))[0]
+        stored = []
+        # never upscale, but always make the smallest size
+        sizes = sorted(sizes)
+        sizes = [size for size in sizes if size <= min(image.size)] or \
+            sizes[:1]
+        for size in sizes:
+            resized = ProcessorPipeline([Transpose(Transpose.AUTO),
+                                         ResizeToFill(size, size)]
+                                        ).process(image)
+            for format in formats:
+                options = dict(OPTIONS.get(format, {}), quality=quality)
+                output = StringIO()
+                save_image(resized, output, format, options)
+                path = 'imag/renditions/%s-%d.%s' % (base, size,
+                                                     EXTENSIONS[format])
+                stored.append((size, format, default_storage.save(
+                    path, ContentFile(output.getvalue()))))
+        return stored
+    except Exception:
+        logger.exception('Could not process %s', name)
+        return None
+
+
+def swap(pk, original, renditions, replaced=None):
+    """ Make ``renditions`` of ``original`` the images of About ``pk``
+
+    The rendition rows and About.image change in one transaction. Results
+    for an original that has been replaced meanwhile are thrown away.
+    ``replaced`` is the original the upload took the place of, deleted
+    once nothing shows it. Without ``renditions``, when the upload could
+    not be rendered, image_original is cleared so it gets renditions on
+    demand like photos uploaded before the workers.
+    """
+    with transaction.atomic():
+        person = About.objects.select_for_update().filter(pk=pk).first()
+        if person is None or person.image_original.name != original:
+            old = [name for _, _, name in renditions or []]
+        else:
+            old = list(person.renditions.values_list('image', flat=True))
+            person.renditions.all().delete()
+            if renditions is None:
+                logger.warning('No renditions of %s, they will be made on '
+                               'demand', original)
+                person.image_original = ''
+                fields = ['image_original']
+            else:
+                ImageRendition.objects.bulk_create(
+                    [ImageRendition(about=person, width=width, format=format,
+                                    image=name)
+                     for width, format, name in renditions])
+                person.image = min(renditions, key=lambda rendition: (
+                    rendition[1] != 'JPEG', rendition[0]))[2]
+                fields = ['image']
+            # post_save audits the change and expires the cached pages
+            person.save(update_fields=fields)
+        if replaced and replaced != original and (
+                person is None or replaced not in (
+                    person.image.name, person.image_original.name)):
+            old.append(replaced)
+    for name in old:
+        default_storage.delete(name)
+
+
+def _swap_done(pk, original, replaced):
+    # runs on the result thread of the pool, which must not die
+    def callback(renditions):
+        try:
+            swap(pk, original, renditions, replaced)
+        except Exception:
+            logger.exception('Could not swap in renditions of %s', original)
+        finally:
+            connection.close()
+    return callback
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool():
+    """ The worker processes, started on first use """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = multiprocessing.Pool(
+                getattr(settings, 'IMAGE_WORKERS', 2), maxtasksperchild=100)
+            atexit.register(_pool.terminate)
+        return _pool
+
+
+def process(person):
+    """ Render the just uploaded image of ``person`` in the background
+
+    The upload is kept as the original and shown until its renditions
+    are ready. With IMAGE_WORKERS = 0 the work is done right away.
+    """
+    original = person.image.name
+    stored = About.objects.filter(pk=person.pk)
+    replaced = stored.values_list('image_original', flat=True).first()
+    stored.update(image_original=original)
+    args = (original, rendition_sizes(), rendition_formats(),
+            getattr(settings, 'PROFILE_IMAGE_QUALITY', 90))
+    if not getattr(settings, 'IMAGE_WORKERS', 2):
+        swap(person.pk, original, render(*args), replaced)
+        return
+    pool().apply_async(render, args,
+                       callback=_swap_done(person.pk, original, replaced))
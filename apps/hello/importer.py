@@ -0,0 +1,215 @@
+import csv
+import json
+import re
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counts, feed
+from .models import AllRequest
+from .retention import rollup
+from .utils import memoize
+
+
+# the path stops at the query string, RequestMiddleware records it so
+ACCESS_LOG = re.compile(
+    r'\S+ \S+ \S+ \[(?P<date>[^\]]+)\] '
+    r'"(?P<method>[A-Z]+) (?P<path>[^\s?]+)[^"]*"')
+
+UTC = timezone.utc
+
+
+class Offset(timezone.tzinfo):
+    """ Fixed UTC offset of an access log timestamp """
+    def __init__(self, minutes):
+        self._offset = timedelta(minutes=minutes)
+
+    def utcoffset(self, date):
+        return self._offset
+
+    def dst(self, date):
+        return timedelta(0)
+
+
+def parse_date(value):
+    if not value:
+        return None
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError('%r is not a date' % value)
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, timezone.get_current_timezone())
+    return date
+
+
+def parse_log_date(value):
+    stamp, _, zone = value.partition(' ')
+    date = datetime.strptime(stamp, '%d/%b/%Y:%H:%M:%S')
+    if not zone:
+        return timezone.make_aware(date, UTC)
+    minutes = int(zone[1:3]) * 60 + int(zone[3:5])
+    date = date.replace(tzinfo=Offset(-minutes if zone[0] == '-'
+                                      else minutes))
+    return date.astimezone(UTC)
+
+
+# what the parsers raise for a line they can't read
+PARSE_ERRORS = (ValueError, KeyError, TypeError, AttributeError, csv.Error)
+
+
+def parse_each(items, parse):
+    """ parse(item) of every item, None for the ones that can't be parsed
+
+    Errors are caught line by line, an error leaving a generator would
+    end it and drop every line after the bad one.
+    """
+    items = iter(items)
+    while True:
+        try:
+            row = parse(next(items))
+        except StopIteration:
+            return
+        except PARSE_ERRORS:
+            row = None
+        yield row
+
+
+def parse_ndjson(lines):
+    dates = memoize(parse_date)
+
+    def parse(line):
+        data = json.loads(line)
+        return (dates(data.get('date')), data['method'], data['path'],
+                data.get('priority', 0))
+    return parse_each((line for line in lines if line.strip()), parse)
+
+
+def parse_csv(lines):
+    dates = memoize(parse_date)
+
+    def parse(data):
+        return (dates(data.get('date')), data['method'].decode('utf-8'),
+                data['path'].decode('utf-8'), data.get('priority') or 0)
+    return parse_each(csv.DictReader(lines), parse)
+
+
+def parse_access_log(lines):
+    """ Common and combined log format lines, with priority 0 """
+    dates = memoize(parse_log_date)
+
+    def parse(line):
+        match = ACCESS_LOG.match(line)
+        if match is None:
+            raise ValueError('%r is not an access log line' % line[:80])
+        return (dates(match.group('date')), match.group('method'),
+                match.group('path').decode('utf-8'), 0)
+    return parse_each(lines, parse)
+
+
+FORMATS = {
+    'ndjson': parse_ndjson,
+    'csv': parse_csv,
+    'log': parse_access_log,
+}
+
+
+def field_limits():
+    """ Bounds of the priority validators and the field lengths """
+    low, high = None, None
+    for validator in AllRequest._meta.get_field('priority').validators:
+        if isinstance(validator, MinValueValidator):
+            low = validator.limit_value
+        elif isinstance(validator, MaxValueValidator):
+            high = validator.limit_value
+    return (low, high,
+            AllRequest._meta.get_field('method').max_length,
+            AllRequest._meta.get_field('path').max_length)
+
+
+def validate(batch, limits):
+    """ The rows of ``batch`` the model would accept
+
+    Checks a whole batch against bounds read once from the priority
+    validators instead of running full_clean() on every instance. Lines
+    the parser couldn't read are None. Rows without a date get the time
+    of the import, as the field default would give them on save().
+    """
+    low, high, method_length, path_length = limits
+    now = timezone.now()
+    valid = []
+    for row in batch:
+        if row is None:
+            continue
+        date, method, path, priority = row
+        try:
+            priority = int(priority)
+        except (TypeError, ValueError, OverflowError):
+            continue
+        if not isinstance(method, basestring) or \
+                not isinstance(path, basestring):
+            continue
+        if (low is None or priority >= low) and \
+                (high is None or priority <= high) and \
+                method and len(method) <= method_length and \
+                path and len(path) <= path_length:
+            valid.append((date or now, method, path, priority))
+    return valid
+
+
+def insert(rows, counted=False):
+    """ Insert validated rows with one executemany
+
+    This is the INSERT bulk_create would run, without building and
+    preparing a model instance per row, which costs more than the insert
+    itself on SQLite. Like bulk_create it sends no signals. ``counted``
+    marks rows whose stats are written in the same transaction.
+    """
+    to_db = memoize(connection.ops.value_to_db_datetime)
+    connection.cursor().executemany(
+        'INSERT INTO %s (date, method, path, priority, counted) '
+        'VALUES (%%s, %%s, %%s, %%s, %%s)'
+        % connection.ops.quote_name(AllRequest._meta.db_table),
+        [(to_db(date), method, path, priority, counted)
+         for date, method, path, priority in rows])
+    counts.add(AllRequest, len(rows))
+
+
+def import_rows(rows, chunk_size=5000, progress=None):
+    """ Insert (date, method, path, priority) rows into AllRequest
+
+    Every chunk is validated and stored with one executemany in its own
+    transaction, skipping the per-row save signals; the feed, caches and
+    live stats are updated once per chunk instead. ``progress`` is called
+    with (imported, rejected, seconds) after every chunk. Returns
+    (imported, rejected).
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1, not %r'
+                         % chunk_size)
+    limits = field_limits()
+    live = getattr(settings, 'REQUEST_STATS_LIVE', True)
+    rows = iter(rows)
+    imported = rejected = 0
+    started = time.time()
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            break
+        valid = validate(batch, limits)
+        rejected += len(batch) - len(valid)
+        with transaction.atomic():
+            insert(valid, live)
+            if live:
+                rollup([(None,) + row for row in valid])
+        imported += len(valid)
+        if progress is not None:
+            progress(imported, rejected, time.time() - started)
+    if imported:
+        feed.requests_changed()
+    return imported, rejected
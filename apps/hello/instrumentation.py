@@ -0,0 +1,152 @@
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+def _geometric(start, end, ratio):
+    bounds = []
+    value = start
+    while value < end:
+        bounds.append(round(value, 3))
+        value *= ratio
+    return bounds + [end]
+
+
+# Upper bounds of the histogram buckets. Times are in milliseconds, about
+# 10% apart from 0.1ms to 10 minutes; query counts are exact up to 50.
+TIME_BOUNDS = _geometric(0.1, 600000, 1.1)
+COUNT_BOUNDS = range(51) + _geometric(60, 100000, 1.2)
+
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram(object):
+    """ Counts of values in fixed buckets, for approximate percentiles
+
+    Memory doesn't grow with the number of values; a percentile is the
+    upper bound of the bucket it falls in, but never more than the
+    largest value seen.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        if not self.count:
+            return None
+        rank = self.count * percent / 100.0
+        seen = 0
+        for index, number in enumerate(self.buckets):
+            seen += number
+            if seen >= rank and number:
+                if index == len(self.bounds):
+                    return self.max
+                return min(self.bounds[index], self.max)
+        return self.max
+
+    def summary(self):
+        data = dict(('p%d' % percent, self.percentile(percent))
+                    for percent in PERCENTILES)
+        data['mean'] = self.total / float(self.count) if self.count else None
+        data['max'] = self.max
+        return data
+
+
+_local = threading.local()
+
+
+def _queries_so_far():
+    return sum(len(connection.queries) for connection in connections.all())
+
+
+@contextmanager
+def uncounted():
+    """ Leave the queries run inside out of the view's query count
+
+    For work that only runs on the request thread because a writer is
+    synchronous, as under tests, and otherwise happens on its own.
+    """
+    start = _queries_so_far()
+    try:
+        yield
+    finally:
+        _local.uncounted = uncounted_queries() + _queries_so_far() - start
+
+
+def uncounted_queries():
+    """ Queries run in uncounted() on this thread so far """
+    return getattr(_local, 'uncounted', 0)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class ViewStats(object):
+    """ Wall time, query time and query counts of every view, in memory
+
+    Numbers are kept per URL name, in histograms of this process only.
+    """
+
+    METRICS = (('time_ms', TIME_BOUNDS), ('db_ms', TIME_BOUNDS),
+               ('queries', COUNT_BOUNDS), ('view_queries', COUNT_BOUNDS))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, name, *values):
+        """ Add one request to ``name``, ``values`` in METRICS order """
+        with self._lock:
+            view = self._views.get(name)
+            if view is None:
+                view = self._views[name] = [
+                    Histogram(bounds) for _, bounds in self.METRICS]
+            for histogram, value in zip(view, values):
+                histogram.add(value)
+
+    def snapshot(self):
+        """ {url name: {'count': n, metric: {p50, p95, p99, mean, max}}} """
+        with self._lock:
+            return dict(
+                (name, dict([('count', view[0].count)] + [
+                    (metric, histogram.summary()) for (metric, _), histogram
+                    in zip(self.METRICS, view)]))
+                for name, view in self._views.items())
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+view_stats = ViewStats()
+
+
+def check_budget(name, queries):
+    """ Warn, or raise QueryBudgetExceeded with VIEW_QUERY_BUDGETS_STRICT,
+    when view ``name`` ran more queries than VIEW_QUERY_BUDGETS allows """
+    budget = getattr(settings, 'VIEW_QUERY_BUDGETS', {}).get(name)
+    if budget is None or queries <= budget:
+        return
+    message = '%s ran %d queries, its budget is %d' % (name, queries,
+                                                       budget)
+    if getattr(settings, 'VIEW_QUERY_BUDGETS_STRICT', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.hello.bulk import apply_rules
+from apps.hello.models import PriorityRule
+
+
+class Command(BaseCommand):
+    args = ''
+    help = 'Give stored requests the priority of the first rule they match'
+
+    def handle(self, *args, **options):
+        rules = list(PriorityRule.objects.all())
+        counts = apply_rules((rule.path, rule.method, rule.priority)
+                             for rule in rules)
+        for rule, count in zip(rules, counts):
+            self.stdout.write('%s: %d requests' % (rule, count))
+        self.stdout.write('Updated %d requests' % sum(counts))
@@ -0,0 +1,94 @@
+import random
+import time
+from datetime import timedelta
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.hello import counts
+from apps.hello.models import AllRequest
+
+
+QUERIES = (
+    ('request_list',
+     lambda: AllRequest.objects.order_by('-date', '-id')[:10]),
+    ('request_priority',
+     lambda: AllRequest.objects.order_by('-priority', '-id')[:10]),
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    args = ''
+    help = ('Time the request list queries while AllRequest grows. Rows '
+            'are inserted in a transaction that is rolled back afterwards')
+    option_list = BaseCommand.option_list + (
+        make_option('--sizes', default='10000,100000,1000000',
+                    help='Comma separated table sizes to measure at'),
+        make_option('--repeat', type='int', default=20,
+                    help='Runs of every query, the best one is reported'),
+        make_option('--keep', action='store_true', default=False,
+                    help="Commit the generated rows instead of rolling "
+                         "them back"),
+    )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options['sizes'].split(','))
+        except ValueError:
+            raise CommandError('--sizes must be a list of integers')
+        if AllRequest.objects.exists() and not options['keep']:
+            self.stdout.write('AllRequest already has rows, sizes are '
+                              'counted on top of them')
+        self.explain()
+        try:
+            with transaction.atomic():
+                self.run(sizes, options['repeat'])
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, sizes, repeat):
+        self.stdout.write('%12s' % 'rows' + ''.join('%20s' % name
+                                                    for name, _ in QUERIES))
+        inserted = 0
+        start = timezone.now() - timedelta(seconds=sizes[-1])
+        for size in sizes:
+            while inserted < size:
+                chunk = min(10000, size - inserted)
+                AllRequest.objects.bulk_create([
+                    AllRequest(method=random.choice(('GET', 'POST')),
+                               path='/bench/%d/' % (i % 100),
+                               priority=random.randint(0, 9),
+                               date=start + timedelta(seconds=i))
+                    for i in xrange(inserted, inserted + chunk)])
+                counts.add(AllRequest, chunk)
+                inserted += chunk
+            timings = [self.measure(query, repeat) for _, query in QUERIES]
+            self.stdout.write('%12d' % size + ''.join('%18.3fms' % t
+                                                      for t in timings))
+
+    def measure(self, query, repeat):
+        best = None
+        for _ in xrange(repeat):
+            started = time.time()
+            list(query())
+            elapsed = (time.time() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def explain(self):
+        if connection.vendor != 'sqlite':
+            return
+        cursor = connection.cursor()
+        for name, query in QUERIES:
+            sql, params = query().query.sql_with_params()
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = '; '.join(row[-1] for row in cursor.fetchall())
+            self.stdout.write('%s: %s' % (name, plan))
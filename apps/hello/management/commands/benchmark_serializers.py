@@ -0,0 +1,108 @@
+import json
+import random
+import time
+from datetime import timedelta
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.hello import counts
+from apps.hello.models import AllRequest
+from apps.hello.serializers import (DATE_FORMAT, FORMATS, date_formatter,
+                                    json_backend, request_rows)
+
+
+class Rollback(Exception):
+    pass
+
+
+def old_records(requests):
+    # what ajax_request_list did before apps.hello.serializers
+    return json.dumps([{'req_id': req.id,
+                        'req_date': req.date.strftime(DATE_FORMAT),
+                        'req_method': req.method,
+                        'req_path': req.path,
+                        'req_priority': req.priority} for req in requests])
+
+
+def strftime_records(rows):
+    return [{'req_id': pk, 'req_date': date.strftime(DATE_FORMAT),
+             'req_method': method, 'req_path': path,
+             'req_priority': priority}
+            for pk, date, method, path, priority in rows]
+
+
+class Command(BaseCommand):
+    args = ''
+    help = ('Time the ways of turning requests into JSON. Rows are '
+            'inserted in a transaction that is rolled back afterwards')
+    option_list = BaseCommand.option_list + (
+        make_option('--rows', type='int', default=1000,
+                    help='Requests serialized per run'),
+        make_option('--repeat', type='int', default=20,
+                    help='Runs of every variant, the best one is reported'),
+        make_option('--backends', default='ujson,simplejson,json',
+                    help='Comma separated JSON modules to try'),
+    )
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['repeat'] < 1:
+            raise CommandError('--rows and --repeat must be positive')
+        try:
+            with transaction.atomic():
+                self.run(options['rows'], options['repeat'],
+                         options['backends'].split(','))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def variants(self, count, backends):
+        def queryset():
+            return AllRequest.objects.order_by('-id')[:count]
+
+        rows = request_rows(queryset())
+        yield 'dates only, strftime', lambda: [
+            date.strftime(DATE_FORMAT) for _, date, _, _, _ in rows]
+        dates = date_formatter()
+        yield 'dates only, cached', lambda: [
+            dates(date) for _, date, _, _, _ in rows]
+        yield 'instances, strftime, json', lambda: old_records(queryset())
+        yield 'values_list, strftime, json', lambda: json.dumps(
+            strftime_records(request_rows(queryset())))
+        yield 'values_list, cached dates, json', lambda: json.dumps(
+            FORMATS['records'](request_rows(queryset())))
+        for name in backends:
+            found, dumps = json_backend([name])
+            if found != name or name == 'json':
+                continue
+            yield 'values_list, cached dates, %s' % name, (
+                lambda dumps=dumps: dumps(FORMATS['records'](
+                    request_rows(queryset()))))
+        yield 'columns, cached dates, json', lambda: json.dumps(
+            FORMATS['columns'](request_rows(queryset())))
+
+    def run(self, count, repeat, backends):
+        start = timezone.now() - timedelta(seconds=count)
+        AllRequest.objects.bulk_create([
+            AllRequest(method=random.choice(('GET', 'POST')),
+                       path='/bench/%d/' % (i % 100),
+                       priority=random.randint(0, 9),
+                       date=start + timedelta(milliseconds=i * 250))
+            for i in xrange(count)])
+        counts.add(AllRequest, count)
+        self.stdout.write('%-40s%14s%14s' % ('variant', 'ms', 'us/row'))
+        for name, variant in self.variants(count, backends):
+            best = self.measure(variant, repeat)
+            self.stdout.write('%-40s%14.3f%14.2f'
+                              % (name, best, best * 1000 / count))
+
+    def measure(self, variant, repeat):
+        best = None
+        for _ in xrange(repeat):
+            started = time.time()
+            variant()
+            elapsed = (time.time() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
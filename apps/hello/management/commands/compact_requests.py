@@ -0,0 +1,42 @@
+from datetime import timedelta
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.hello.models import RequestMinuteStat
+from apps.hello.retention import compact, prune
+
+
+class Command(BaseCommand):
+    args = ''
+    help = 'Delete old requests from AllRequest, keeping their stats'
+    option_list = BaseCommand.option_list + (
+        make_option('--days', type='int',
+                    default=getattr(settings, 'REQUEST_RETENTION_DAYS', 30),
+                    help='Keep requests of the last DAYS days'),
+        make_option('--chunk', type='int',
+                    default=getattr(settings, 'REQUEST_RETENTION_CHUNK',
+                                    1000),
+                    help='Rows deleted per transaction'),
+        make_option('--archive', action='store_true',
+                    default=getattr(settings, 'REQUEST_RETENTION_ARCHIVE',
+                                    False),
+                    help='Copy rows to monthly archive tables first'),
+        make_option('--minute-days', type='int',
+                    default=getattr(settings, 'REQUEST_STATS_MINUTE_DAYS',
+                                    7),
+                    help='Keep per-minute stats of the last MINUTE_DAYS '
+                         'days'),
+    )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        removed = compact(before, options['chunk'], options['archive'])
+        self.stdout.write('Compacted %d requests older than %s'
+                          % (removed, before))
+        before = timezone.now() - timedelta(days=options['minute_days'])
+        pruned = prune(RequestMinuteStat, before, options['chunk'])
+        self.stdout.write('Deleted %d minute stats older than %s'
+                          % (pruned, before))
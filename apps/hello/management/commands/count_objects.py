@@ -1,15 +1,52 @@
-from django.core.management.base import BaseCommand
+import json
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
 from django.db import models
 
+from apps.hello.counts import estimated_counts, exact_counts
+
 
 class Command(BaseCommand):
     args = '<model_name model_name ...>'
     help = 'Print to console all models and count the objects in every model'
+    option_list = BaseCommand.option_list + (
+        make_option('--fast', action='store_true', default=False,
+                    help='Use row counts from the table statistics where '
+                         'the database keeps them'),
+        make_option('--threads', type='int', default=4,
+                    help='Tables counted at once, except on SQLite'),
+        make_option('--format', default='text',
+                    help='text or json'),
+    )
 
     def handle(self, *args, **options):
-        for app in models.get_apps():
-            for model in models.get_models(app):
-                self.stdout.write('Model %s has %d objects in DB'
-                                  % (model.__name__, model.objects.count()))
-                self.stderr.write('Error: Model %s has %d objects in DB'
-                                  % (model.__name__, model.objects.count()))
+        if options['format'] not in ('text', 'json'):
+            raise CommandError('--format must be text or json')
+        names = set(name.lower() for name in args)
+        found = [model for app in models.get_apps()
+                 for model in models.get_models(app)
+                 if not names or model.__name__.lower() in names or
+                 model._meta.object_name.lower() in names or
+                 '%s.%s' % (model._meta.app_label,
+                            model.__name__.lower()) in names]
+        if names and not found:
+            raise CommandError('No models named %s' % ', '.join(args))
+        estimates = estimated_counts(found) if options['fast'] else {}
+        counts = exact_counts([model for model in found
+                               if model not in estimates],
+                              options['threads'])
+        counts.update(estimates)
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps([
+                {'app': model._meta.app_label, 'model': model.__name__,
+                 'count': counts[model], 'exact': model not in estimates}
+                for model in found]))
+            return
+        for model in found:
+            about = 'about ' if model in estimates else ''
+            self.stdout.write('Model %s has %s%d objects in DB'
+                              % (model.__name__, about, counts[model]))
+            self.stderr.write('Error: Model %s has %s%d objects in DB'
+                              % (model.__name__, about, counts[model]))
@@ -0,0 +1,47 @@
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.hello import export
+
+
+class Command(BaseCommand):
+    args = ''
+    help = 'Write the request log as CSV or NDJSON'
+    option_list = BaseCommand.option_list + (
+        make_option('--format', default='csv',
+                    help='csv or ndjson'),
+        make_option('--start',
+                    help='Only requests made on or after this date'),
+        make_option('--end',
+                    help='Only requests made on or before this date'),
+        make_option('--priority',
+                    help='Only requests with this priority'),
+        make_option('--min-priority', dest='min_priority',
+                    help='Only requests with at least this priority'),
+        make_option('--output',
+                    help='File to write to instead of stdout'),
+        make_option('--chunk', type='int',
+                    default=getattr(settings, 'REQUEST_EXPORT_CHUNK', 2000),
+                    help='Rows read per query'),
+    )
+
+    def handle(self, *args, **options):
+        if options['format'] not in export.FORMATS:
+            raise CommandError('--format must be csv or ndjson')
+        if options['chunk'] < 1:
+            raise CommandError('--chunk must be at least 1')
+        try:
+            filters = export.parse_filters(options)
+        except ValueError as error:
+            raise CommandError(str(error))
+        lines = export.FORMATS[options['format']][0]
+        rows = export.iter_rows(export.export_queryset(**filters),
+                                options['chunk'])
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(lines(rows))
+        else:
+            for line in lines(rows):
+                self.stdout.write(line, ending='')
@@ -0,0 +1,49 @@
+import sys
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.hello import importer
+
+
+class Command(BaseCommand):
+    args = '<file file ...>'
+    help = ('Load requests into AllRequest from NDJSON, CSV or access log '
+            'files, or from stdin')
+    option_list = BaseCommand.option_list + (
+        make_option('--format', default='ndjson',
+                    help='ndjson, csv or log (common log format)'),
+        make_option('--chunk', type='int',
+                    default=getattr(settings, 'REQUEST_IMPORT_CHUNK', 5000),
+                    help='Rows inserted per transaction'),
+        make_option('--quiet', action='store_true', default=False,
+                    help='Only report the totals'),
+    )
+
+    def handle(self, *args, **options):
+        if options['format'] not in importer.FORMATS:
+            raise CommandError('--format must be ndjson, csv or log')
+        if options['chunk'] < 1:
+            raise CommandError('--chunk must be at least 1')
+        parse = importer.FORMATS[options['format']]
+        progress = None if options['quiet'] else self.progress
+        files = [open(name, 'rb') for name in args] or [sys.stdin]
+        imported = rejected = 0
+        try:
+            for lines in files:
+                done = importer.import_rows(parse(lines), options['chunk'],
+                                            progress)
+                imported += done[0]
+                rejected += done[1]
+        finally:
+            for lines in files:
+                if lines is not sys.stdin:
+                    lines.close()
+        self.stdout.write('Imported %d requests, rejected %d'
+                          % (imported, rejected))
+
+    def progress(self, imported, rejected, seconds):
+        self.stdout.write('%d imported, %d rejected, %d rows/s'
+                          % (imported, rejected,
+                             imported / seconds if seconds else 0))
@@ -1,10 +1,93 @@
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from . import analytics, feed, retention
+from .instrumentation import check_budget, uncounted_queries, view_stats
 from .models import AllRequest
+from .rules import RecordingRules, priority_rules
+from .writers import request_writer
+
+
+recording_rules = RecordingRules.from_settings()
+
+request_writer.listeners.append(feed.request_feed.publish)
+if getattr(settings, 'REQUEST_STATS_LIVE', True):
+    request_writer.before_write.append(analytics.count_requests)
 
 
 class RequestMiddleware(object):
+    def __init__(self):
+        retention.schedule()
+
+    def process_request(self, request):
+        method, path = request.method, request.path
+        if recording_rules.should_record(method, path):
+            request_writer.add(AllRequest(
+                method=method, path=path,
+                priority=priority_rules.priority(method, path)))
+
+    @staticmethod
+    def stats():
+        """ Counters of enqueued, written and dropped request log rows """
+        return request_writer.stats()
+
+
+def view_name(request):
+    """ URL name of the view that answered ``request`` """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '(unresolved)'
+    return match.view_name
+
+
+class ViewStatsMiddleware(object):
+    """ Records wall time, query count and query time of every view
+
+    Queries are counted through the debug cursor of every connection,
+    as CaptureQueriesContext does, so it works with DEBUG off. Put it
+    first in MIDDLEWARE_CLASSES so the time and queries of the other
+    middleware are included; ``view_queries`` leaves out those run
+    before the view, such as the request log writes, and writes of a
+    synchronous log writer during the view. The body of a
+    streaming response is sent after it has measured.
+    """
+
     def process_request(self, request):
-        req2 = AllRequest()
-        req2.method = request.method
-        req2.path = request.path
-        if req2.path != '/request/ajax_request_list':
-            req2.save()
+        states = [(connection, connection.use_debug_cursor,
+                   len(connection.queries))
+                  for connection in connections.all()]
+        for connection, _, _ in states:
+            connection.use_debug_cursor = True
+        request._view_stats = (time.time(), states, None, 0)
+
+    def process_view(self, request, view, args, kwargs):
+        started, states = request._view_stats[:2]
+        request._view_stats = (started, states, [
+            len(connection.queries) for connection, _, _ in states],
+            uncounted_queries())
+
+    def process_response(self, request, response):
+        started = getattr(request, '_view_stats', None)
+        if started is None:
+            return response
+        del request._view_stats
+        started, states, view_starts, skipped = started
+        time_ms = (time.time() - started) * 1000
+        queries, view_queries, db_ms = 0, 0, 0.0
+        for index, (connection, debug, start) in enumerate(states):
+            new = connection.queries[start:]
+            queries += len(new)
+            if view_starts is not None:
+                view_queries += len(connection.queries) - view_starts[index]
+            db_ms += sum(float(query['time']) for query in new) * 1000
+            connection.use_debug_cursor = debug
+            if not (debug or settings.DEBUG):
+                del connection.queries[start:]
+        if view_starts is not None:
+            view_queries -= uncounted_queries() - skipped
+        name = view_name(request)
+        view_stats.record(name, time_ms, db_ms, queries, view_queries)
+        check_budget(name, view_queries)
+        return response
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'RequestMinuteStat'
+        db.create_table(u'hello_requestminutestat', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('start', self.gf('django.db.models.fields.DateTimeField')(db_index=True)),
+            ('method', self.gf('django.db.models.fields.CharField')(max_length=50)),
+            ('path', self.gf('django.db.models.fields.CharField')(max_length=200)),
+            ('priority', self.gf('django.db.models.fields.IntegerField')(default=0)),
+            ('count', self.gf('django.db.models.fields.IntegerField')(default=0)),
+        ))
+        db.send_create_signal(u'hello', ['RequestMinuteStat'])
+
+        # Adding unique constraint on 'RequestMinuteStat', fields ['start', 'method', 'path', 'priority']
+        db.create_unique(u'hello_requestminutestat', ['start', 'method', 'path', 'priority'])
+
+        # Adding model 'RequestHourStat'
+        db.create_table(u'hello_requesthourstat', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('start', self.gf('django.db.models.fields.DateTimeField')(db_index=True)),
+            ('method', self.gf('django.db.models.fields.CharField')(max_length=50)),
+            ('path', self.gf('django.db.models.fields.CharField')(max_length=200)),
+            ('priority', self.gf('django.db.models.fields.IntegerField')(default=0)),
+            ('count', self.gf('django.db.models.fields.IntegerField')(default=0)),
+        ))
+        db.send_create_signal(u'hello', ['RequestHourStat'])
+
+        # Adding unique constraint on 'RequestHourStat', fields ['start', 'method', 'path', 'priority']
+        db.create_unique(u'hello_requesthourstat', ['start', 'method', 'path', 'priority'])
+
+
+    def backwards(self, orm):
+        # Removing unique constraint on 'RequestHourStat', fields ['start', 'method', 'path', 'priority']
+        db.delete_unique(u'hello_requesthourstat', ['start', 'method', 'path', 'priority'])
+
+        # Removing unique constraint on 'RequestMinuteStat', fields ['start', 'method', 'path', 'priority']
+        db.delete_unique(u'hello_requestminutestat', ['start', 'method', 'path', 'priority'])
+
+        # Deleting model 'RequestMinuteStat'
+        db.delete_table(u'hello_requestminutestat')
+
+        # Deleting model 'RequestHourStat'
+        db.delete_table(u'hello_requesthourstat')
+
+
+    models = {
+        u'hello.about': {
+            'Meta': {'object_name': 'About'},
+            'bio': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'}),
+            'date': ('django.db.models.fields.DateField', [], {'null': 'True', 'blank': 'True'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '100'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'image': ('django.db.models.fields.files.ImageField', [], {'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'jabber': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'last_name': ('django.db.models.fields.CharField', [], {'max_length': '200'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '200'}),
+            'other_contact': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'}),
+            'skype': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        },
+        u'hello.allrequest': {
+            'Meta': {'object_name': 'AllRequest', 'index_together': "[['priority', 'date']]"},
+            'date': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now', 'null': 'True', 'db_index': 'True', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'method': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'path': ('django.db.models.fields.CharField', [], {'max_length': '200'}),
+            'priority': ('django.db.models.fields.IntegerField', [], {'default': '0', 'db_index': 'True'})
+        },
+        u'hello.requesthourstat': {
+            'Meta': {'unique_together': "[['start', 'method', 'path', 'priority']]", 'object_name': 'RequestHourStat'},
+            'count': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'method': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'path': ('django.db.models.fields.CharField', [], {'max_length': '200'}),
+            'priority': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'start': ('django.db.models.fields.DateTimeField', [], {'db_index': 'True'})
+        },
+        u'hello.requestminutestat': {
+            'Meta': {'unique_together': "[['start', 'method', 'path', 'priority']]", 'object_name': 'RequestMinuteStat'},
+            'count': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'method': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'path': ('django.db.models.fields.CharField', [], {'max_length': '200'}),
+            'priority': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'start': ('django.db.models.fields.DateTimeField', [], {'db_index': 'True'})
+        },
+        u'hello.signaldata': {
+            'Meta': {'object_name': 'SignalData'},
+            'date': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'message': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'})
+        }
+    }
+
+    complete_apps = ['hello']
\ No newline at end of file
@@ -1,6 +1,8 @@
+import re
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
-from django.db.models import signals
 from django.core.validators import MaxValueValidator, MinValueValidator
 
 
@@ -14,30 +16,119 @@ class About(models.Model):
     skype = models.CharField(max_length=100)
     other_contact = models.TextField(null=True, blank=True)
     image = models.ImageField(upload_to='imag', null=True, blank=True)
+    image_original = models.ImageField(upload_to='imag', null=True,
+                                       blank=True, editable=False)
 
     def __unicode__(self):
         return self.last_name
 
 
+class ImageRendition(models.Model):
+    about = models.ForeignKey(About, related_name='renditions')
+    width = models.IntegerField()
+    format = models.CharField(max_length=10)
+    image = models.ImageField(upload_to='imag/renditions')
+
+    class Meta:
+        ordering = ['width', 'format']
+        unique_together = [['about', 'width', 'format']]
+
+    def __unicode__(self):
+        return "%s %dpx %s" % (self.about, self.width, self.format)
+
+
 class AllRequest(models.Model):
     priority = models.IntegerField(validators=[MinValueValidator(0),
                                                MaxValueValidator(9)],
-                                   default=0)
-    date = models.DateTimeField(default=timezone.now, null=True, blank=True)
+                                   default=0, db_index=True)
+    date = models.DateTimeField(default=timezone.now, null=True, blank=True,
+                                db_index=True)
     method = models.CharField(max_length=50)
     path = models.CharField(max_length=200)
+    # set on rows whose stats were written with them
+    counted = models.BooleanField(default=False, editable=False)
 
     def __unicode__(self):
         return "Request - " + str(self.id)
 
 
+class RequestMinuteStat(models.Model):
+    start = models.DateTimeField(db_index=True)
+    method = models.CharField(max_length=50)
+    path = models.CharField(max_length=200)
+    priority = models.IntegerField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [['start', 'method', 'path', 'priority']]
+
+    def __unicode__(self):
+        return "%s %s %s - %d" % (self.start, self.method, self.path,
+                                  self.count)
+
+
+class RequestHourStat(models.Model):
+    start = models.DateTimeField(db_index=True)
+    method = models.CharField(max_length=50)
+    path = models.CharField(max_length=200)
+    priority = models.IntegerField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [['start', 'method', 'path', 'priority']]
+
+    def __unicode__(self):
+        return "%s %s %s - %d" % (self.start, self.method, self.path,
+                                  self.count)
+
+
+class PriorityRule(models.Model):
+    path = models.CharField(max_length=200, blank=True,
+                            help_text='Path prefix, or a regular expression '
+                                      'if it starts with ^. Empty matches '
+                                      'every path.')
+    method = models.CharField(max_length=50, blank=True,
+                              help_text='Empty matches every method.')
+    priority = models.IntegerField(validators=[MinValueValidator(0),
+                                               MaxValueValidator(9)])
+    order = models.IntegerField(default=0,
+                                help_text='The first matching rule wins.')
+
+    class Meta:
+        ordering = ['order', 'id']
+
+    def clean(self):
+        self.method = self.method.upper()
+        if self.path.startswith('^'):
+            try:
+                re.compile(self.path)
+            except re.error as error:
+                raise ValidationError({'path': [unicode(error)]})
+
+    def __unicode__(self):
+        return "%s %s -> %d" % (self.method or '*', self.path or '*',
+                                self.priority)
+
+
+class RowCounter(models.Model):
+    table = models.CharField(max_length=100, unique=True)
+    count = models.BigIntegerField(default=0)
+
+    def __unicode__(self):
+        return "%s - %d" % (self.table, self.count)
+
+
 class SignalData(models.Model):
     date = models.DateTimeField(default=timezone.now)
     message = models.TextField(null=True, blank=True)
 
 
-from .signals import add_signal_save, add_signal_delete
+from . import counts, signals as audit
+from .caching import depend_on
 
 
-signals.post_save.connect(add_signal_save, dispatch_uid='SomeText')
-signals.post_delete.connect(add_signal_delete, dispatch_uid='SomeText2')
+audit.register(About, AllRequest)
+counts.track(AllRequest, SignalData)
+# bumps the generation every PriorityRuleTable compares on lookups, from
+# whatever process the rules are changed in
+depend_on(PriorityRule)
@@ -0,0 +1,169 @@
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(obj):
+    return '%d.%d' % (obj.priority, obj.pk)
+
+
+def decode_cursor(value):
+    try:
+        priority, pk = value.split('.')
+        return int(priority), int(pk)
+    except (AttributeError, ValueError):
+        raise InvalidCursor(value)
+
+
+class KeysetPage(object):
+    def __init__(self, object_list, number, has_next, has_previous,
+                 paginator, earlier=(), later=()):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        # rows beyond the page on either side, nearest first
+        self._earlier = earlier
+        self._later = later
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_cursor(self):
+        return encode_cursor(self.object_list[-1]) \
+            if self._has_next and self.object_list else None
+
+    def previous_cursor(self):
+        return encode_cursor(self.object_list[0]) \
+            if self._has_previous and self.object_list else None
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def page_links(self):
+        """ [(number, query string)] of the pages of the window around
+        this one, in order, with None as the query string of this one """
+        per_page = self.paginator.per_page
+        links = [(self.number, None)]
+        if self.previous_cursor() is not None:
+            links.insert(0, (self.number - 1, 'before=%s&page=%d' % (
+                self.previous_cursor(), self.number - 1)))
+        # the first row of a page is the cursor of the one before it
+        for offset in range(per_page - 1, len(self._earlier) - 1, per_page):
+            number = links[0][0] - 1
+            if number < 1:
+                break
+            links.insert(0, (number, 'before=%s&page=%d' % (
+                encode_cursor(self._earlier[offset]), number)))
+        if self.next_cursor() is not None:
+            links.append((self.number + 1, 'after=%s&page=%d' % (
+                self.next_cursor(), self.number + 1)))
+        for offset in range(per_page - 1, len(self._later) - 1, per_page):
+            number = links[-1][0] + 1
+            links.append((number, 'after=%s&page=%d' % (
+                encode_cursor(self._later[offset]), number)))
+        return links
+
+
+def _after(queryset, priority, pk):
+    """ Rows after (priority, pk) in page order """
+    return queryset.filter(priority__lte=priority).filter(
+        Q(priority__lt=priority) | Q(pk__lt=pk)).order_by(
+        '-priority', '-pk')
+
+
+def _before(queryset, priority, pk):
+    """ Rows before (priority, pk) in page order, nearest first """
+    return queryset.filter(priority__gte=priority).filter(
+        Q(priority__gt=priority) | Q(pk__gt=pk)).order_by(
+        'priority', 'pk')
+
+
+class KeysetPaginator(object):
+    """ Pages AllRequest-like rows by (priority, id), newest first
+
+    Unlike django.core.paginator.Paginator it never counts the table or
+    uses OFFSET: a page is the ``per_page`` rows after (or before) the
+    cursor of the last (or first) row of the page seen before, which an
+    index on priority answers directly. ``count`` is only used for display
+    and may be approximate.
+
+    A ``window`` above 1 reads that many pages of rows on either side of
+    the page, so that it can link the pages up to ``window`` away.
+    """
+
+    def __init__(self, queryset, per_page, count=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.count = count
+
+    @property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(1, -(-self.count // self.per_page))
+
+    def page(self, after=None, before=None, last=False, number=1,
+             window=1):
+        if after is not None:
+            after = decode_cursor(after)
+        elif before is not None:
+            before = decode_cursor(before)
+        # the page and the rows of the window beyond it in one query
+        limit = self.per_page * max(1, window) + 1
+        beyond = self.per_page * (window - 1) + 1 if window > 1 else 0
+
+        if before is not None or last:
+            queryset = self.queryset.order_by('priority', 'pk') if last \
+                else _before(self.queryset, *before)
+            rows = list(queryset[:limit])
+            earlier = rows[self.per_page:]
+            rows = rows[:self.per_page][::-1]
+            has_next, has_previous = before is not None, bool(earlier)
+            later = list(_after(self.queryset, rows[-1].priority,
+                                rows[-1].pk)[:beyond]) \
+                if has_next and beyond and rows else []
+            if last:
+                number = self.num_pages or number
+        else:
+            queryset = self.queryset.order_by('-priority', '-pk') \
+                if after is None else _after(self.queryset, *after)
+            rows = list(queryset[:limit])
+            later = rows[self.per_page:]
+            rows = rows[:self.per_page]
+            has_next, has_previous = bool(later), after is not None
+            earlier = list(_before(self.queryset, rows[0].priority,
+                                   rows[0].pk)[:beyond]) \
+                if has_previous and beyond and rows else []
+        if not rows and (after is not None or before is not None):
+            # nothing is left beyond an old cursor, after compaction or
+            # bulk edits for example
+            return self.page(window=window)
+        # numbers come from the query string: keep them between the
+        # first page and the last one
+        if not has_previous:
+            number = 1
+        else:
+            if self.num_pages is not None:
+                number = min(number, self.num_pages - int(has_next))
+            number = max(number, 2)
+        return KeysetPage(rows, number, has_next, has_previous, self,
+                          earlier, later)
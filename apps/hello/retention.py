@@ -0,0 +1,225 @@
+import logging
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db import reset_queries
+from django.db.models import F, IntegerField
+from django.db.models.sql import DeleteQuery
+from django.utils import timezone
+
+from . import counts, feed
+from .models import AllRequest, RequestMinuteStat, RequestHourStat
+
+
+logger = logging.getLogger(__name__)
+
+ROW_FIELDS = ('id', 'date', 'method', 'path', 'priority')
+
+
+def minute(date):
+    return date.replace(second=0, microsecond=0)
+
+
+def hour(date):
+    return date.replace(minute=0, second=0, microsecond=0)
+
+
+def rollup(rows):
+    """ Add (id, date, method, path, priority) rows to the stat tables """
+    for model, bucket in ((RequestMinuteStat, minute),
+                          (RequestHourStat, hour)):
+        counts = Counter((bucket(date), method, path, priority)
+                         for _, date, method, path, priority in rows
+                         if date is not None)
+        if counts:
+            add_counts(model, counts)
+
+
+def add_counts(model, counts):
+    """ Add {(start, method, path, priority): count} to ``model``
+
+    Buckets that have no row yet, all of them when old logs are imported,
+    are created with one bulk insert, the others are updated with one
+    executemany.
+    """
+    starts = [key[0] for key in counts]
+    existing = set(model.objects
+                   .filter(start__gte=min(starts), start__lte=max(starts))
+                   .values_list('start', 'method', 'path', 'priority'))
+    new = [key for key in counts if key not in existing]
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(
+                [model(start=start, method=method, path=path,
+                       priority=priority, count=counts[start, method, path,
+                                                       priority])
+                 for start, method, path, priority in new])
+    except IntegrityError:
+        # somebody else created some of them meanwhile
+        for key in new:
+            add_count(model, *(key + (counts[key],)))
+    qn = connection.ops.quote_name
+    to_db = connection.ops.value_to_db_datetime
+    connection.cursor().executemany(
+        'UPDATE %s SET count = count + %%s WHERE start = %%s AND '
+        'method = %%s AND path = %%s AND priority = %%s'
+        % qn(model._meta.db_table),
+        [(counts[key], to_db(key[0])) + key[1:]
+         for key in counts if key in existing])
+
+
+def add_count(model, start, method, path, priority, count):
+    stats = model.objects.filter(start=start, method=method, path=path,
+                                 priority=priority)
+    if stats.update(count=F('count') + count):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(start=start, method=method, path=path,
+                                 priority=priority, count=count)
+    except IntegrityError:
+        stats.update(count=F('count') + count)
+
+
+def archive_table(date):
+    return 'hello_allrequest_%04d%02d' % (date.year, date.month)
+
+
+def archive_columns():
+    """ Column definitions of the archive tables, in the types the
+    database uses for AllRequest """
+    qn = connection.ops.quote_name
+    # the ids are copied, not generated
+    columns = ['%s %s NOT NULL PRIMARY KEY'
+               % (qn('id'), IntegerField().db_type(connection))]
+    for name in ROW_FIELDS[1:]:
+        field = AllRequest._meta.get_field(name)
+        columns.append('%s %s %sNULL' % (qn(field.column),
+                                         field.db_type(connection),
+                                         '' if field.null else 'NOT '))
+    return ', '.join(columns)
+
+
+def archive(rows):
+    """ Copy rows into per-month archive tables next to hello_allrequest """
+    qn = connection.ops.quote_name
+    to_db = connection.ops.value_to_db_datetime
+    cursor = connection.cursor()
+    tables = {}
+    for row in rows:
+        if row[1] is not None:
+            tables.setdefault(archive_table(row[1]), []).append(row)
+    for table, table_rows in tables.items():
+        cursor.execute('CREATE TABLE IF NOT EXISTS %s (%s)'
+                       % (qn(table), archive_columns()))
+        cursor.executemany(
+            'INSERT INTO %s (id, date, method, path, priority) '
+            'VALUES (%%s, %%s, %%s, %%s, %%s)' % qn(table),
+            [(pk, to_db(date), method, path, priority)
+             for pk, date, method, path, priority in table_rows])
+
+
+def compact(before, chunk_size=1000, keep_archive=False):
+    """ Roll requests older than ``before`` into stats and delete them
+
+    Rows go in chunks of ``chunk_size``, each in its own short
+    transaction, so the write lock is never held for long. Rows that
+    weren't counted when they were recorded, older ones, ones saved
+    through the ORM or written with live stats off, are added to the
+    stats first. With ``keep_archive`` the raw rows are copied to monthly
+    archive tables too. Returns the number of rows removed.
+    """
+    removed = 0
+    while True:
+        with transaction.atomic():
+            rows = list(AllRequest.objects.filter(date__lt=before)
+                        .order_by('date', 'id')
+                        .values_list('counted', *ROW_FIELDS)[:chunk_size])
+            if not rows:
+                break
+            rollup([row[1:] for row in rows if not row[0]])
+            if keep_archive:
+                archive([row[1:] for row in rows])
+            # no post_delete: nothing about these rows needs auditing
+            DeleteQuery(AllRequest).delete_batch([row[1] for row in rows],
+                                                 AllRequest.objects.db)
+            counts.add(AllRequest, -len(rows))
+        removed += len(rows)
+    if removed:
+        feed.requests_changed()
+    return removed
+
+
+def prune(model, before, chunk_size=1000):
+    """ Delete the ``model`` stats of buckets starting before ``before``
+
+    Like compact() it deletes ``chunk_size`` rows per transaction.
+    Returns the number of rows removed.
+    """
+    removed = 0
+    while True:
+        with transaction.atomic():
+            ids = list(model.objects.filter(start__lt=before)
+                       .values_list('pk', flat=True)[:chunk_size])
+            if not ids:
+                break
+            DeleteQuery(model).delete_batch(ids, model.objects.db)
+        removed += len(ids)
+    return removed
+
+
+def compact_from_settings():
+    now = timezone.now()
+    days = getattr(settings, 'REQUEST_RETENTION_DAYS', 30)
+    chunk_size = getattr(settings, 'REQUEST_RETENTION_CHUNK', 1000)
+    removed = compact(now - timedelta(days=days), chunk_size,
+                      getattr(settings, 'REQUEST_RETENTION_ARCHIVE', False))
+    minute_days = getattr(settings, 'REQUEST_STATS_MINUTE_DAYS', 7)
+    prune(RequestMinuteStat, now - timedelta(days=minute_days), chunk_size)
+    return removed
+
+
+class RetentionTask(object):
+    """ Runs compact_from_settings every ``interval`` seconds in a thread """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run,
+                                        name='request-retention')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                removed = compact_from_settings()
+            except DatabaseError:
+                logger.exception('Request log compaction failed')
+            else:
+                logger.info('Compacted %d old requests', removed)
+            # nothing else clears the query log DEBUG keeps on this thread
+            reset_queries()
+
+
+def schedule():
+    """ Start the periodic task if REQUEST_RETENTION_INTERVAL is set """
+    global retention_task
+    interval = getattr(settings, 'REQUEST_RETENTION_INTERVAL', None)
+    if interval and retention_task is None:
+        retention_task = RetentionTask(interval)
+        retention_task.start()
+
+
+retention_task = None
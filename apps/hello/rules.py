@@ -0,0 +1,160 @@
+import random
+import re
+
+from django.conf import settings
+from django.db.models.loading import get_model
+
+from .caching import cache_backend, generations
+
+
+class PathMatcher(object):
+    """ Matches a path against many prefixes and regexps in one go
+
+    Plain strings are path prefixes, strings starting with ``^`` are
+    regular expressions. All of them are compiled into a single
+    alternation, so a lookup is one regex match whatever the number of
+    patterns.
+    """
+
+    def __init__(self, patterns):
+        parts = [p if p.startswith('^') else re.escape(p) for p in patterns]
+        self._regex = re.compile('|'.join('(?:%s)' % p for p in parts))
+        self._empty = not parts
+
+    def match(self, path):
+        return not self._empty and self._regex.match(path) is not None
+
+
+class RecordingRules(object):
+    """ Decides which requests RequestMiddleware records
+
+    A request is recorded when its path matches ``include`` (if given) and
+    doesn't match ``exclude``. It is then kept with a probability taken from
+    ``method_rates`` for its method times ``sample_rates`` for the longest
+    prefix of its path ending with ``/`` (or the path itself). Both default
+    to 1, a rate of 0 never records.
+    """
+
+    def __init__(self, include=(), exclude=(), sample_rates=None,
+                 method_rates=None):
+        self.include = PathMatcher(include) if include else None
+        self.exclude = PathMatcher(exclude)
+        self.sample_rates = dict(sample_rates or {})
+        self.method_rates = dict((method.upper(), rate) for method, rate
+                                 in (method_rates or {}).items())
+
+    @classmethod
+    def from_settings(cls):
+        return cls(include=getattr(settings, 'REQUEST_LOG_INCLUDE', ()),
+                   exclude=getattr(settings, 'REQUEST_LOG_EXCLUDE', ()),
+                   sample_rates=getattr(settings, 'REQUEST_LOG_SAMPLE_RATES',
+                                        None),
+                   method_rates=getattr(settings, 'REQUEST_LOG_METHOD_RATES',
+                                        None))
+
+    def rate(self, method, path):
+        if self.include is not None and not self.include.match(path):
+            return 0
+        if self.exclude.match(path):
+            return 0
+        rate = self.method_rates.get(method, 1)
+        if rate and self.sample_rates:
+            rate *= self._path_rate(path)
+        return rate
+
+    def should_record(self, method, path):
+        rate = self.rate(method, path)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def _path_rate(self, path):
+        rates = self.sample_rates
+        if path in rates:
+            return rates[path]
+        end = path.rfind('/')
+        while end >= 0:
+            prefix = path[:end + 1]
+            if prefix in rates:
+                return rates[prefix]
+            end = path.rfind('/', 0, end)
+        return 1
+
+
+class PriorityRules(object):
+    """ Priority of a request from an ordered list of rules
+
+    ``rules`` are (path, method, priority) tuples, the first one matching
+    a request wins. A path is a prefix, or a regular expression when it
+    starts with ``^``; an empty path or method matches everything. The
+    rules that can apply to a method are compiled into one alternation
+    with a named group per rule, so classifying a request is a dict
+    lookup and one regex match.
+    """
+
+    # Python 2's re allows at most 100 groups per pattern, group 0 included
+    GROUPS_PER_REGEX = 99
+
+    def __init__(self, rules):
+        self.rules = [(path, method.upper(), priority)
+                      for path, method, priority in rules]
+        self._any = self._compile(None)
+        self._methods = dict((method, self._compile(method))
+                             for _, method, _ in self.rules if method)
+
+    @classmethod
+    def from_models(cls):
+        from .models import PriorityRule
+        return cls(PriorityRule.objects.values_list('path', 'method',
+                                                    'priority'))
+
+    def _compile(self, method):
+        rules = [(index, path) for index, (path, rule_method, _)
+                 in enumerate(self.rules) if rule_method in ('', method)]
+        chunks = [[]]
+        groups = 0
+        for index, path in rules:
+            if path.startswith('^'):
+                # the rule's own groups count against the limit too
+                size = 1 + re.compile(path).groups
+            else:
+                path, size = re.escape(path), 1
+            if chunks[-1] and groups + size > self.GROUPS_PER_REGEX:
+                chunks.append([])
+                groups = 0
+            chunks[-1].append('(?P<r%d>%s)' % (index, path))
+            groups += size
+        return [re.compile('|'.join(chunk)) for chunk in chunks if chunk]
+
+    def priority(self, method, path, default=0):
+        for regex in self._methods.get(method, self._any):
+            match = regex.match(path)
+            if match is not None:
+                return self.rules[int(match.lastgroup[1:])][2]
+        return default
+
+
+class PriorityRuleTable(object):
+    """ PriorityRules of the PriorityRule table
+
+    They are compiled on first use and again after a rule is saved or
+    deleted in any process: saves and deletes bump the generation of
+    PriorityRule in VIEW_CACHE_BACKEND, as for cached views, and every
+    lookup compares it with one cache get.
+    """
+
+    def __init__(self):
+        self._rules = None
+        self._generation = None
+
+    def priority(self, method, path, default=0):
+        generation = generations(
+            [get_model('hello', 'PriorityRule')],
+            cache_backend(getattr(settings, 'VIEW_CACHE_BACKEND',
+                                  'default')))
+        rules = self._rules
+        if rules is None or generation != self._generation:
+            rules = self._rules = PriorityRules.from_models()
+            self._generation = generation
+        return rules.priority(method, path, default)
+
+
+priority_rules = PriorityRuleTable()
@@ -0,0 +1,89 @@
+import json
+from datetime import datetime
+from importlib import import_module
+
+from django.conf import settings
+from django.db.models.query import QuerySet
+
+from .utils import memoize
+
+
+FIELDS = ('id', 'date', 'method', 'path', 'priority')
+KEYS = ('req_id', 'req_date', 'req_method', 'req_path', 'req_priority')
+DATE_FORMAT = '%d/%b/%Y %H:%M:%S'
+
+
+def json_backend(names=None):
+    """ (name, dumps) of the first of ``names`` that can be imported
+
+    ujson and the like are optional, the standard json module is used
+    when none of them is installed.
+    """
+    for name in names or getattr(settings, 'JSON_BACKENDS', ('json',)):
+        try:
+            return name, import_module(name).dumps
+        except ImportError:
+            continue
+    return 'json', json.dumps
+
+
+JSON_BACKEND, dumps = json_backend()
+
+
+def date_formatter(format=DATE_FORMAT):
+    """ strftime(format) of datetimes, formatted once per second
+
+    Requests come many per second, so most dates of a page share their
+    formatted value with the row before. None stays None.
+    """
+    formatted = memoize(lambda second: datetime(*second).strftime(format))
+
+    def format_date(date):
+        if date is None:
+            return None
+        # a tuple is hashed several times faster than an aware datetime
+        return formatted((date.year, date.month, date.day, date.hour,
+                          date.minute, date.second))
+    return format_date
+
+
+format_date = date_formatter()
+
+
+def request_rows(requests):
+    """ (id, date, method, path, priority) of every request
+
+    Querysets fetch only these columns. Lists of instances, as the feed
+    keeps them, are read as they are.
+    """
+    if isinstance(requests, QuerySet):
+        return list(requests.values_list(*FIELDS))
+    return [(req.id, req.date, req.method, req.path, req.priority)
+            for req in requests]
+
+
+def records(rows):
+    """ [{key: value}], one object per request """
+    return [{'req_id': pk, 'req_date': format_date(date),
+             'req_method': method, 'req_path': path,
+             'req_priority': priority}
+            for pk, date, method, path, priority in rows]
+
+
+def columns(rows):
+    """ {key: [values]}, one array per field in request order """
+    data = dict(zip(KEYS, map(list, zip(*rows)))) if rows else \
+        dict((key, []) for key in KEYS)
+    data['req_date'] = map(format_date, data['req_date'])
+    return data
+
+
+FORMATS = {
+    'records': records,
+    'columns': columns,
+}
+
+
+def serialize(requests, format='records'):
+    """ JSON of ``requests`` in one of FORMATS """
+    return dumps(FORMATS[format](request_rows(requests)))
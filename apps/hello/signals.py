@@ -1,27 +1,54 @@
+from django.db.models import signals
+
 from .models import SignalData
+from .writers import audit_writer
+
+
+_registry = set()
+
+
+def register(*models):
+    """ Log saves and deletes of ``models`` into SignalData """
+    for model in models:
+        uid = 'audit-%s' % model._meta.db_table
+        signals.post_save.connect(add_signal_save, sender=model,
+                                  dispatch_uid=uid)
+        signals.post_delete.connect(add_signal_delete, sender=model,
+                                    dispatch_uid=uid)
+        _registry.add(model)
+
+
+def unregister(*models):
+    for model in models:
+        uid = 'audit-%s' % model._meta.db_table
+        signals.post_save.disconnect(sender=model, dispatch_uid=uid)
+        signals.post_delete.disconnect(sender=model, dispatch_uid=uid)
+        _registry.discard(model)
+
+
+def is_registered(model):
+    return model in _registry
+
+
+def audit(action, model, number):
+    """ Queue a SignalData row, they are written in batches """
+    audit_writer.add(SignalData(message="%s row with id %s in %s"
+                                        % (action, number, model.__name__)))
+
+
+def audit_bulk(action, model, count, condition):
+    """ Queue one SignalData row for ``count`` rows changed at once """
+    audit_writer.add(SignalData(message="%s %d rows in %s where %s"
+                                        % (action, count, model.__name__,
+                                           condition)))
 
 
 def add_signal_save(instance, **kwargs):
     number = getattr(instance, 'id', 'None')
-    name_class = kwargs['sender']
-    name_model = name_class.__name__
-
-    if kwargs['created'] and name_model != 'SignalData':
-        entry = SignalData(message="Create row with id " + str(number) +
-                                   " in " + name_model)
-        entry.save()
-    elif not kwargs['created'] and name_model != 'SignalData':
-        entry = SignalData(message="Update row with id " + str(number) +
-                                   " in " + name_model)
-        entry.save()
+    action = 'Create' if kwargs['created'] else 'Update'
+    audit(action, kwargs['sender'], number)
 
 
 def add_signal_delete(instance, **kwargs):
     number = getattr(instance, 'id', 'None')
-    name_class = kwargs['sender']
-    name_model = name_class.__name__
-
-    if name_model != 'SignalData':
-        entry = SignalData(message="Delete row with id " + str(number) +
-                                   " in " + name_model)
-        entry.save()
+    audit('Delete', kwargs['sender'], number)
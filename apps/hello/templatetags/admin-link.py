@@ -1,11 +1,61 @@
-from django.contrib.contenttypes.models import ContentType
 from django import template
-from django.core.urlresolvers import reverse
+from django.contrib import admin
+from django.core.urlresolvers import get_resolver, get_urlconf, reverse
+from django.utils.http import urlquote
 register = template.Library()
 
+PLACEHOLDER = '__pk__'
+
+# (resolver the prefixes were reversed with, {model: (prefix, suffix)})
+_links = (None, {})
+
+
+def _reverse_link(model):
+    opts = model._meta.concrete_model._meta
+    url = reverse('admin:%s_%s_change' % (opts.app_label, opts.model_name),
+                  args=(PLACEHOLDER,))
+    return tuple(url.split(PLACEHOLDER, 1))
+
+
+def admin_links():
+    """ {model: (prefix, suffix)} of the admin change URLs
+
+    They are reversed once for every model registered in the admin and
+    kept until the URLconf in use changes, so a link is a dict lookup
+    and a string join instead of a ContentType lookup and a resolver
+    walk.
+    """
+    global _links
+    resolver = get_resolver(get_urlconf())
+    if _links[0] is not resolver:
+        _links = (resolver, dict((model, _reverse_link(model))
+                                 for model in admin.site._registry))
+    return _links[1]
+
+
+def change_url(obj):
+    links = admin_links()
+    model = type(obj)
+    if model not in links:
+        links[model] = _reverse_link(model)
+    prefix, suffix = links[model]
+    return '%s%s%s' % (prefix, urlquote(obj.pk, safe=''), suffix)
+
 
 @register.simple_tag
 def edit_link(obj):
-    edit_obj = ContentType.objects.get_for_model(obj)
-    return reverse('admin:{}_{}_change'.format(edit_obj.app_label,
-                                               edit_obj.model), args=(obj.id,))
+    return change_url(obj)
+
+
+@register.assignment_tag
+def edit_links(objects):
+    """ (object, admin change URL) of every object in ``objects``
+
+    ::
+
+        {% edit_links requests as links %}
+        {% for req, url in links %}
+          <a href="{{ url }}">{{ req }}</a>
+        {% endfor %}
+    """
+    return [(obj, change_url(obj)) for obj in objects]
@@ -0,0 +1,47 @@
+from django import template
+from django.conf import settings
+
+from apps.hello.caching import cache_backend, depend_on, make_key
+register = template.Library()
+
+
+class CacheFragmentNode(template.Node):
+    def __init__(self, nodelist, name, models, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.labels = [label for label in models.split(',') if label]
+        self.vary_on = vary_on
+        self.models = None
+
+    def render(self, context):
+        if self.models is None:
+            self.models = depend_on(*self.labels)
+        store = cache_backend(getattr(settings, 'FRAGMENT_CACHE_BACKEND',
+                                      'default'))
+        key = make_key('fragment:' + self.name, self.models,
+                       [var.resolve(context) for var in self.vary_on], store)
+        value = store.get(key)
+        if value is None:
+            value = self.nodelist.render(context)
+            store.set(key, value)
+        return value
+
+
+@register.tag
+def cachefragment(parser, token):
+    """ Cache the enclosed template until one of the given models changes
+
+    {% cachefragment "name" "app.Model,app.Other" vary_on ... %}
+        ...
+    {% endcachefragment %}
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            "'%s' takes a name, model labels and optional vary on "
+            "arguments" % bits[0])
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    return CacheFragmentNode(nodelist, bits[1].strip('"\''),
+                             bits[2].strip('"\''),
+                             [parser.compile_filter(bit) for bit in bits[3:]])
@@ -0,0 +1,35 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from apps.hello.images import image_sources
+register = template.Library()
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp', 'PNG': 'image/png'}
+
+
+def srcset(urls):
+    return format_html_join(', ', '{0} {1}w', ((url, width)
+                                               for width, url in urls))
+
+
+@register.simple_tag
+def profile_image(person, sizes='200px', css_class='', alt=''):
+    """ <picture> of a profile photo with a srcset per format
+
+    Browsers pick the smallest rendition that fills ``sizes``, and WebP
+    over JPEG when they can show it::
+
+        {% profile_image person "(max-width: 767px) 100vw, 200px" "img" %}
+    """
+    sources = image_sources(person)
+    fallback = sources[0][1]
+    if fallback[0][0] is None:
+        return format_html('<img class="{0}" src="{1}" alt="{2}">',
+                           css_class, fallback[0][1], alt)
+    return format_html(
+        '<picture>{0}<img class="{1}" src="{2}" srcset="{3}" sizes="{4}" '
+        'alt="{5}"></picture>',
+        format_html_join('', '<source type="{0}" srcset="{1}" sizes="{2}">',
+                         ((MIME_TYPES[format], srcset(urls), sizes)
+                          for format, urls in sources[1:])),
+        css_class, fallback[0][1], srcset(fallback), sizes, alt)
@@ -1,15 +1,52 @@
 # -*- coding: utf-8 -*-
 import json
+import threading
+import time
+from datetime import timedelta
+from importlib import import_module
 from StringIO import StringIO
 from tempfile import NamedTemporaryFile
 from PIL import Image
 
 from django.test import TestCase
-from django.core.urlresolvers import reverse
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.core.urlresolvers import clear_url_caches, reverse
+from django.db import connection, models
+from django.utils import timezone
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.contrib.auth.models import User
+from django.utils.unittest import skipUnless
+from django.conf import settings
+from django.core.cache import cache, get_cache
+from django.db.models import Q
 
 from .models import About, AllRequest, SignalData
-from hello.forms import EditPersonForm, EditRequestForm
+from .models import RequestMinuteStat, RequestHourStat, PriorityRule
+from .forms import EditPersonForm, EditRequestForm
+from . import signals as audit
+from .bulk import apply_rules, set_priority
+from .caching import cache_backend, generations
+from .counts import row_count
+from .feed import RequestFeed
+from .middleware import RequestMiddleware
+from .export import export_queryset, iter_rows
+from . import analytics, counts, feed, images, serializers
+from . import urls as hello_urls
+from .images import pool, process, render, swap
+from .importer import import_rows, parse_access_log
+from .instrumentation import COUNT_BOUNDS, TIME_BOUNDS, Histogram
+from .instrumentation import QueryBudgetExceeded, view_stats
+from .pagination import KeysetPaginator, encode_cursor
+from .retention import compact, prune
+from .rules import PriorityRuleTable, PriorityRules, RecordingRules
+from .writers import BufferedWriter
+from .management.commands.benchmark_requests import \
+    QUERIES as BENCHMARK_QUERIES
 
 
 class PersonTest(TestCase):
@@ -67,6 +104,58 @@ class PersonTest(TestCase):
         self.assertTemplateUsed(response, 'hello/about.html')
 
 
+class CachingTest(TestCase):
+    """ Unit tests for view and fragment caching """
+    fixtures = ['initial_data.json']
+
+    def test_about_page_is_cached(self):
+        """ Test repeated home page is served from cache """
+        self.client.get(reverse('about'))
+        response = self.client.get(reverse('about'))
+        self.assertContains(response, 'Melnychuk')
+        self.assertEqual(response.templates, [])
+
+    def test_saved_person_invalidates_cache(self):
+        """ Test home page shows saved changes """
+        self.client.get(reverse('about'))
+        person = About.objects.get(pk=1)
+        person.name = 'Changed'
+        person.save()
+        response = self.client.get(reverse('about'))
+        self.assertContains(response, 'Changed')
+
+    def test_cache_is_per_user(self):
+        """ Test logged in user doesnt get anonymous page """
+        self.client.get(reverse('about'))
+        self.client.login(username='admin', password='1')
+        response = self.client.get(reverse('about'))
+        self.assertContains(response, 'Log Out')
+
+    @override_settings(VIEW_CACHE_BACKEND='files')
+    def test_generations_live_in_the_shared_backend(self):
+        """ Test saves invalidate entries of the configured backend """
+        store = get_cache('files')
+        before = generations([About], store)
+        About.objects.get(pk=1).save()
+        self.assertNotEqual(generations([About], store), before)
+
+    def test_backends_are_created_once(self):
+        """ Test every alias gets one backend instance per thread """
+        self.assertIs(cache_backend('files'), cache_backend('files'))
+        self.assertIsNot(cache_backend('files'), cache_backend('default'))
+
+    def test_fragment_is_cached_until_model_changes(self):
+        """ Test cachefragment tag """
+        tpl = Template('{% load fragment-cache %}'
+                       '{% cachefragment "test" "hello.About" pk %}'
+                       '{{ value }}{% endcachefragment %}')
+        self.assertEqual(tpl.render(Context({'pk': 1, 'value': 'a'})), 'a')
+        self.assertEqual(tpl.render(Context({'pk': 1, 'value': 'b'})), 'a')
+        self.assertEqual(tpl.render(Context({'pk': 2, 'value': 'c'})), 'c')
+        About.objects.get(pk=1).save()
+        self.assertEqual(tpl.render(Context({'pk': 1, 'value': 'd'})), 'd')
+
+
 class AllRequestTest(TestCase):
     """ Unit tests for Request model and views"""
     def test_last_request_page_available(self):
@@ -191,6 +280,1071 @@ class AllRequestTest(TestCase):
         self.assertEqual(readable_json[0]["req_path"], '/request/')
 
 
+class RequestFeedTest(TestCase):
+    """ Unit tests for the incremental request feed """
+    def test_since_returns_only_new_rows(self):
+        """ Test since parameter """
+        AllRequest.objects.all().delete()
+        old = AllRequest.objects.create(method='GET', path='/old/')
+        AllRequest.objects.create(method='GET', path='/new/')
+        response = self.client.get(reverse('ajax_list'), {'since': old.id})
+        data = json.loads(response.content)
+        self.assertEqual([row['req_path'] for row in data], ['/new/'])
+
+    def test_bad_since(self):
+        """ Test bad since parameter """
+        response = self.client.get(reverse('ajax_list'), {'since': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unchanged_feed_is_not_modified(self):
+        """ Test etag of unchanged feed """
+        response = self.client.get(reverse('ajax_list'), {'since': 5})
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('ajax_list'), {'since': 5},
+                                       HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_request_changes_etag(self):
+        """ Test etag changes after a request is logged """
+        response = self.client.get(reverse('ajax_list'), {'since': 5})
+        self.client.get(reverse('about'))
+        response = self.client.get(reverse('ajax_list'), {'since': 5},
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+
+class SerializerTest(TestCase):
+    """ Unit tests for the request feed serializers """
+    def setUp(self):
+        AllRequest.objects.all().delete()
+        self.date = timezone.now().replace(microsecond=5)
+        for path in ('/a/', '/b/'):
+            AllRequest.objects.create(method='GET', path=path, priority=3,
+                                      date=self.date)
+
+    def test_records_format(self):
+        """ Test default format is a list of objects """
+        response = self.client.get(reverse('ajax_list'))
+        data = json.loads(response.content)
+        self.assertEqual([row['req_path'] for row in data], ['/b/', '/a/'])
+        self.assertEqual(data[0]['req_date'],
+                         self.date.strftime('%d/%b/%Y %H:%M:%S'))
+        self.assertEqual(data[0]['req_priority'], 3)
+
+    def test_columns_format(self):
+        """ Test columns format has one array per field """
+        first = AllRequest.objects.order_by('id')[0].id
+        response = self.client.get(reverse('ajax_list'),
+                                   {'since': first - 1, 'format': 'columns'})
+        data = json.loads(response.content)
+        self.assertEqual(data['req_id'], [first + 1, first])
+        self.assertEqual(data['req_method'], ['GET', 'GET'])
+        self.assertEqual(len(set(data['req_date'])), 1)
+
+    def test_bad_format(self):
+        """ Test unknown format is refused """
+        response = self.client.get(reverse('ajax_list'), {'format': 'x'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('ajax_wait'), {'format': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_querysets_and_instances_give_the_same_json(self):
+        """ Test querysets are read with values_list """
+        requests = AllRequest.objects.order_by('-id')
+        with CaptureQueriesContext(connection) as queries:
+            from_queryset = serializers.serialize(requests, 'columns')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(from_queryset,
+                         serializers.serialize(list(requests), 'columns'))
+        self.assertEqual(serializers.serialize([], 'columns'),
+                         serializers.dumps(dict(
+                             (key, []) for key in serializers.KEYS)))
+
+    def test_date_formatter(self):
+        """ Test dates are formatted once per second """
+        format_date = serializers.date_formatter('%S')
+        self.assertEqual(format_date(self.date), self.date.strftime('%S'))
+        self.assertEqual(format_date(self.date + timedelta(microseconds=1)),
+                         self.date.strftime('%S'))
+        self.assertIsNone(format_date(None))
+
+    def test_json_backend_falls_back(self):
+        """ Test missing JSON modules are skipped """
+        self.assertEqual(serializers.json_backend(['no_such_json', 'json']),
+                         ('json', json.dumps))
+        self.assertEqual(serializers.json_backend(['no_such_json'])[0],
+                         'json')
+
+    def test_benchmark_command(self):
+        """ Test benchmark_serializers leaves no rows behind """
+        out = StringIO()
+        call_command('benchmark_serializers', rows=20, repeat=1, stdout=out)
+        self.assertIn('columns, cached dates, json', out.getvalue())
+        self.assertEqual(AllRequest.objects.count(), 2)
+
+
+class RequestPushTest(TestCase):
+    """ Unit tests for the long poll request feed """
+    def setUp(self):
+        AllRequest.objects.all().delete()
+        self.first = AllRequest.objects.create(method='GET', path='/1/')
+        self.second = AllRequest.objects.create(method='GET', path='/2/')
+
+    def rows(self, *ids):
+        return [AllRequest(id=pk, method='GET', path='/%s/' % pk)
+                for pk in ids]
+
+    def test_feed_returns_rows_since(self):
+        """ Test rows newer than since, newest first """
+        request_feed = RequestFeed(size=3)
+        pk = self.second.pk
+        self.assertEqual(request_feed.latest(10), [self.second, self.first])
+        request_feed.publish(self.rows(pk + 1, pk + 2))
+        self.assertEqual([row.pk for row in request_feed.since(pk)],
+                         [pk + 2, pk + 1])
+        self.assertEqual(request_feed.since(pk + 2), [])
+        self.assertIsNone(request_feed.since(0))
+
+    def test_rows_without_ids_are_read_again(self):
+        """ Test a batch without ids sends readers to the database """
+        request_feed = RequestFeed(size=10)
+        pk = self.second.pk
+        self.assertEqual(request_feed.since(pk), [])
+        third = AllRequest.objects.create(method='GET', path='/3/')
+        timer = threading.Timer(0.05, request_feed.publish,
+                                [[AllRequest(method='GET', path='/3/')]])
+        timer.start()
+        rows = request_feed.wait(pk, timeout=5)
+        timer.join()
+        self.assertEqual(rows, [third])
+
+    def test_wait_rejects_bad_timeouts(self):
+        """ Test long poll refuses timeouts it could wait forever on """
+        for timeout in ('nan', 'inf', '-1', 'x'):
+            response = self.client.get(reverse('ajax_wait'),
+                                       {'since': 999999999,
+                                        'timeout': timeout})
+            self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('ajax_wait'),
+                                   {'since': 999999999, 'timeout': '0'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_wait_wakes_up_on_publish(self):
+        """ Test waiting for new rows """
+        request_feed = RequestFeed(size=10)
+        pk = self.second.pk
+        timer = threading.Timer(0.05, request_feed.publish,
+                                [self.rows(pk + 1)])
+        timer.start()
+        rows = request_feed.wait(pk, timeout=5)
+        timer.join()
+        self.assertEqual([row.pk for row in rows], [pk + 1])
+
+    def test_touch_counts_changes(self):
+        """ Test every change moves the version by exactly one """
+        first = feed.touch()
+        self.assertEqual([feed.touch(), feed.touch()], [first + 1, first + 2])
+        self.assertEqual(feed.version(), first + 2)
+
+    def test_feed_sees_rows_of_other_processes(self):
+        """ Test rows written elsewhere reach the buffer and the long poll """
+        request_feed = RequestFeed(size=10, check_interval=0.01)
+        pk = self.second.pk
+        self.assertEqual(request_feed.since(pk), [])
+        # no signals, only the shared version tells about them
+        AllRequest.objects.bulk_create([AllRequest(method='GET',
+                                                   path='/3/')])
+        self.assertEqual(request_feed.since(pk), [])
+        timer = threading.Timer(0.05, feed.touch)
+        timer.start()
+        rows = request_feed.wait(pk, timeout=5)
+        timer.join()
+        self.assertEqual([row.path for row in rows], ['/3/'])
+        self.assertEqual(request_feed.latest(1)[0].path, '/3/')
+
+    def test_wait_times_out(self):
+        """ Test waiting without new rows """
+        request_feed = RequestFeed(size=10)
+        self.assertEqual(request_feed.wait(self.second.pk, timeout=0.01), [])
+
+    def test_wait_view_returns_new_requests(self):
+        """ Test long poll view """
+        AllRequest.objects.all().delete()
+        self.client.get(reverse('about'))
+        first = AllRequest.objects.get()
+        self.client.get(reverse('request_list'))
+        response = self.client.get(reverse('ajax_wait'),
+                                   {'since': first.id, 'timeout': 0})
+        data = json.loads(response.content)
+        self.assertEqual([row['req_path'] for row in data], ['/request/'])
+
+    def test_wait_view_is_not_recorded(self):
+        """ Test long poll requests are not recorded """
+        AllRequest.objects.all().delete()
+        self.client.get(reverse('ajax_wait'), {'timeout': 0})
+        self.assertEqual(AllRequest.objects.count(), 0)
+
+    def test_writer_sets_ids(self):
+        """ Test written rows get their ids """
+        writer = BufferedWriter(AllRequest, size=10, interval=500,
+                                threaded=False, fetch_ids=True)
+        rows = self.rows(None, None, None)
+        for row in rows:
+            writer.add(row)
+        writer.flush()
+        self.assertEqual([row.pk for row in rows],
+                         list(AllRequest.objects.order_by('id')
+                              .values_list('id', flat=True))[-3:])
+
+
+class RecentRequestsTest(TestCase):
+    """ Unit tests for the in-memory last requests """
+    def page_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [query['sql'] for query in queries
+                          if '"hello_allrequest"."path"' in query['sql']]
+
+    def test_last_requests_are_served_from_memory(self):
+        """ Test warm last requests page doesnt query AllRequest """
+        self.client.get(reverse('request_list'))
+        response, queries = self.page_queries(reverse('request_list'))
+        self.assertEqual(queries, [])
+        self.assertEqual(response.context['requests'][0].path, '/request/')
+        response, queries = self.page_queries(reverse('ajax_list'))
+        self.assertEqual(queries, [])
+        self.assertEqual(json.loads(response.content)[0]['req_path'],
+                         '/request/')
+
+    def test_priority_edit_reloads_last_requests(self):
+        """ Test edited priority shows in last requests """
+        self.client.get(reverse('request_list'))
+        req = AllRequest.objects.latest('id')
+        self.client.post(reverse('edit_request', kwargs={'pk': req.id}),
+                         {'priority': 7})
+        response, queries = self.page_queries(reverse('request_list'))
+        self.assertEqual(len(queries), 1)
+        edited = [row for row in response.context['requests']
+                  if row.id == req.id]
+        self.assertEqual(edited[0].priority, 7)
+
+
+class RequestWriterTest(TestCase):
+    """ Unit tests for buffered request logging """
+    def test_middleware_write_is_not_audited(self):
+        """ Test logged request doesnt create SignalData row """
+        SignalData.objects.all().delete()
+        self.client.get(reverse('about'))
+        self.assertEqual(AllRequest.objects.count(), 1)
+        self.assertEqual(SignalData.objects.count(), 0)
+
+    def test_writer_buffers_rows(self):
+        """ Test rows are written only after flush """
+        AllRequest.objects.all().delete()
+        writer = BufferedWriter(AllRequest, size=10, interval=500,
+                                threaded=False)
+        writer.add(AllRequest(method='GET', path='/a/'))
+        writer.add(AllRequest(method='GET', path='/b/'))
+        self.assertEqual(AllRequest.objects.count(), 0)
+        writer.flush()
+        self.assertEqual(AllRequest.objects.count(), 2)
+
+    def test_writer_stop_flushes_rows(self):
+        """ Test stop writes pending rows """
+        AllRequest.objects.all().delete()
+        writer = BufferedWriter(AllRequest, size=10, interval=500,
+                                threaded=False)
+        writer.add(AllRequest(method='POST', path='/c/'))
+        writer.stop()
+        self.assertEqual(AllRequest.objects.get().path, '/c/')
+
+    def test_writer_drops_rows_when_full(self):
+        """ Test drop policy counts lost rows """
+        writer = BufferedWriter(AllRequest, size=10, interval=500,
+                                queue_size=2, threaded=False)
+        for i in range(5):
+            writer.add(AllRequest(method='GET', path='/'))
+        writer.flush()
+        self.assertEqual(writer.stats(), {'enqueued': 2, 'written': 2,
+                                          'dropped': 3, 'queued': 0})
+
+    def test_writer_samples_rows_when_half_full(self):
+        """ Test sample policy keeps every n-th row """
+        writer = BufferedWriter(AllRequest, size=10, interval=500,
+                                queue_size=100, overflow='sample',
+                                sample_rate=5, threaded=False)
+        for i in range(100):
+            writer.add(AllRequest(method='GET', path='/'))
+        self.assertEqual(writer.stats()['enqueued'], 60)
+        self.assertEqual(writer.stats()['dropped'], 40)
+
+    def test_writer_rejects_unknown_policy(self):
+        """ Test unknown overflow policy """
+        self.assertRaises(ImproperlyConfigured, BufferedWriter, AllRequest,
+                          size=10, interval=500, overflow='wait')
+
+    def test_middleware_exposes_counters(self):
+        """ Test request log counters """
+        before = RequestMiddleware.stats()['written']
+        self.client.get(reverse('about'))
+        self.assertEqual(RequestMiddleware.stats()['written'], before + 1)
+
+    def test_writer_survives_any_error(self):
+        """ Test a batch that fails is dropped, the next one written """
+        AllRequest.objects.all().delete()
+        writer = BufferedWriter(AllRequest, size=10, interval=500,
+                                threaded=False)
+        writer.add(object())
+        writer.flush()
+        writer.add(AllRequest(method='GET', path='/a/'))
+        writer.flush()
+        self.assertEqual(writer.stats(), {'enqueued': 2, 'written': 1,
+                                          'dropped': 1, 'queued': 0})
+        self.assertEqual(AllRequest.objects.get().path, '/a/')
+
+    def test_blocking_writer_gives_up(self):
+        """ Test block policy drops rows after its timeout """
+        writer = BufferedWriter(AllRequest, size=10, interval=500,
+                                queue_size=1, overflow='block',
+                                block_timeout=0.01, threaded=False)
+        writer.add(AllRequest(method='GET', path='/'))
+        writer.add(AllRequest(method='GET', path='/'))
+        self.assertEqual(writer.stats()['dropped'], 1)
+
+    def test_writer_stats_view(self):
+        """ Test writer counters are served as JSON """
+        self.client.get(reverse('about'))
+        data = json.loads(self.client.get(reverse('writer_stats')).content)
+        self.assertEqual(data['requests'], RequestMiddleware.stats())
+        self.assertEqual(sorted(data['audit']),
+                         ['dropped', 'enqueued', 'queued', 'written'])
+
+
+class KeysetPaginationTest(TestCase):
+    """ Unit tests for priority list pagination """
+    def setUp(self):
+        AllRequest.objects.all().delete()
+        for i in range(25):
+            AllRequest.objects.create(method='GET', path='/%d/' % i,
+                                      priority=i % 3)
+        self.ordered = list(AllRequest.objects.order_by('-priority', '-id'))
+
+    def test_pages_follow_cursors(self):
+        """ Test next and previous pages """
+        paginator = KeysetPaginator(AllRequest.objects.all(), 10, count=25)
+        first = paginator.page()
+        self.assertEqual(list(first), self.ordered[:10])
+        self.assertFalse(first.has_previous())
+        second = paginator.page(after=first.next_cursor(), number=2)
+        self.assertEqual(list(second), self.ordered[10:20])
+        third = paginator.page(after=second.next_cursor(), number=3)
+        self.assertEqual(list(third), self.ordered[20:])
+        self.assertFalse(third.has_next())
+        back = paginator.page(before=third.previous_cursor(), number=2)
+        self.assertEqual(list(back), self.ordered[10:20])
+        self.assertEqual(back.number, 2)
+        self.assertEqual(paginator.num_pages, 3)
+
+    def test_last_page(self):
+        """ Test last page """
+        paginator = KeysetPaginator(AllRequest.objects.all(), 10, count=25)
+        last = paginator.page(last=True)
+        self.assertEqual(list(last), self.ordered[15:])
+        self.assertEqual(last.number, 3)
+        self.assertFalse(last.has_next())
+
+    def test_bad_cursor_shows_first_page(self):
+        """ Test priority page with bad cursor """
+        response = self.client.get(reverse('request_priority'),
+                                   {'after': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['requests'].number, 1)
+
+    def test_cursor_past_the_rows_shows_first_page(self):
+        """ Test cursors with no rows beyond them """
+        paginator = KeysetPaginator(AllRequest.objects.all(), 10, count=25)
+        for cursor in ({'after': '0.0'}, {'before': '9.100000'}):
+            page = paginator.page(number=3, **cursor)
+            self.assertEqual(list(page), self.ordered[:10])
+            self.assertEqual(page.number, 1)
+            response = self.client.get(reverse('request_priority'), cursor)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['requests'].number, 1)
+
+    def test_page_number_is_clamped(self):
+        """ Test page numbers out of range of the rows """
+        paginator = KeysetPaginator(AllRequest.objects.all(), 10, count=25)
+        cursor = encode_cursor(self.ordered[9])
+        self.assertEqual(paginator.page(after=cursor, number=500).number, 2)
+        self.assertEqual(paginator.page(after=cursor, number=-5).number, 2)
+        response = self.client.get(reverse('request_priority'),
+                                   {'after': cursor, 'page': 500})
+        self.assertEqual(response.context['requests'].number, 2)
+        self.assertContains(response, 'Page 2 of 3')
+
+    def test_page_links_window(self):
+        """ Test links to the pages around the current one """
+        AllRequest.objects.all().delete()
+        for i in range(55):
+            AllRequest.objects.create(method='GET', path='/%d/' % i,
+                                      priority=i % 3)
+        ordered = list(AllRequest.objects.order_by('-priority', '-id'))
+        paginator = KeysetPaginator(AllRequest.objects.all(), 10, count=55)
+        page = paginator.page(after=encode_cursor(ordered[19]), number=3,
+                              window=2)
+        links = page.page_links()
+        self.assertEqual([number for number, query in links],
+                         [1, 2, 3, 4, 5])
+        self.assertIsNone(dict(links)[3])
+        for number, query in links:
+            if query is None:
+                continue
+            params = dict(param.split('=') for param in query.split('&'))
+            linked = paginator.page(params.get('after'),
+                                    params.get('before'),
+                                    number=int(params['page']))
+            self.assertEqual(list(linked),
+                             ordered[(number - 1) * 10:number * 10])
+            self.assertEqual(linked.number, number)
+        first = paginator.page(window=2)
+        self.assertEqual([number for number, query in first.page_links()],
+                         [1, 2, 3])
+        last = paginator.page(last=True, window=2)
+        self.assertEqual([number for number, query in last.page_links()],
+                         [4, 5, 6])
+        self.assertEqual(list(last), ordered[45:])
+
+    def test_priority_page_has_no_count_query(self):
+        """ Test priority page doesnt count rows """
+        self.client.get(reverse('request_priority'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('request_priority'),
+                            {'after': encode_cursor(self.ordered[9]),
+                             'page': 2})
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertIn('"hello_allrequest"."path"', sql)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+
+class AllRequestIndexTest(TestCase):
+    """ Unit tests for AllRequest indexes """
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        cursor = connection.cursor()
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return ' '.join(row[-1] for row in cursor.fetchall())
+
+    def test_request_list_uses_index(self):
+        """ Test last requests are read from the date index """
+        plan = self.query_plan(AllRequest.objects.order_by('-date', '-id'))
+        self.assertIn('USING INDEX', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_priority_list_uses_index(self):
+        """ Test priority page is read from the priority index """
+        plan = self.query_plan(AllRequest.objects.order_by('-priority',
+                                                           '-id'))
+        self.assertIn('USING INDEX', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_benchmark_command(self):
+        """ Test benchmark command rolls back its rows """
+        out = StringIO()
+        call_command('benchmark_requests', sizes='10,20', repeat=1,
+                     stdout=out)
+        self.assertIn('request_priority', out.getvalue())
+        self.assertEqual(AllRequest.objects.count(), 0)
+
+
+class RetentionTest(TestCase):
+    """ Unit tests for request log compaction """
+    def setUp(self):
+        AllRequest.objects.all().delete()
+        self.old = timezone.now().replace(year=2015, month=3, day=1,
+                                          hour=10, minute=5, second=0)
+        for seconds, path in ((1, '/a/'), (2, '/a/'), (70, '/a/'),
+                              (3700, '/b/')):
+            AllRequest.objects.create(
+                method='GET', path=path,
+                date=self.old + timedelta(seconds=seconds))
+        AllRequest.objects.create(method='GET', path='/new/')
+
+    def test_compact_rolls_up_and_deletes(self):
+        """ Test old requests are aggregated and deleted """
+        removed = compact(timezone.now() - timedelta(days=1), chunk_size=2)
+        self.assertEqual(removed, 4)
+        self.assertEqual(list(AllRequest.objects.values_list('path',
+                                                             flat=True)),
+                         ['/new/'])
+        minutes = RequestMinuteStat.objects.order_by('start', 'path')
+        self.assertEqual([(stat.start.minute, stat.path, stat.count)
+                          for stat in minutes],
+                         [(5, '/a/', 2), (6, '/a/', 1), (6, '/b/', 1)])
+        hours = RequestHourStat.objects.order_by('start', 'path')
+        self.assertEqual([(stat.start.hour, stat.path, stat.count)
+                          for stat in hours],
+                         [(10, '/a/', 3), (11, '/b/', 1)])
+
+    def test_compact_doesnt_audit_deletes(self):
+        """ Test compaction doesnt log every deleted row """
+        SignalData.objects.all().delete()
+        compact(timezone.now() - timedelta(days=1))
+        self.assertEqual(SignalData.objects.count(), 0)
+
+    def test_compact_archive(self):
+        """ Test compacted requests are archived by month """
+        compact(timezone.now() - timedelta(days=1), keep_archive=True)
+        cursor = connection.cursor()
+        cursor.execute('SELECT path FROM hello_allrequest_201503 '
+                       'ORDER BY id')
+        self.assertEqual([row[0] for row in cursor.fetchall()],
+                         ['/a/', '/a/', '/a/', '/b/'])
+
+    def test_compact_command(self):
+        """ Test compact_requests command """
+        out = StringIO()
+        call_command('compact_requests', days=1, stdout=out)
+        self.assertIn('Compacted 4 requests', out.getvalue())
+
+    def test_prune_minute_stats(self):
+        """ Test old minute stats are deleted and old ranges use hours """
+        compact(timezone.now() - timedelta(days=1))
+        self.assertEqual(prune(RequestMinuteStat,
+                               timezone.now() - timedelta(days=7),
+                               chunk_size=2), 3)
+        self.assertEqual(RequestMinuteStat.objects.count(), 0)
+        self.assertEqual(RequestHourStat.objects.count(), 2)
+        self.assertEqual(analytics.stat_model(self.old,
+                                              self.old + timedelta(hours=2)),
+                         RequestHourStat)
+
+
+class RecordingRulesTest(TestCase):
+    """ Unit tests for request recording rules """
+    def test_exclude_prefix_and_regex(self):
+        """ Test excluded paths """
+        rules = RecordingRules(exclude=['/static/', '^/admin/jsi18n/$'])
+        self.assertFalse(rules.should_record('GET', '/static/css/a.css'))
+        self.assertFalse(rules.should_record('GET', '/admin/jsi18n/'))
+        self.assertTrue(rules.should_record('GET', '/admin/jsi18n/x'))
+        self.assertTrue(rules.should_record('GET', '/request/'))
+
+    def test_include_limits_recorded_paths(self):
+        """ Test only included paths are recorded """
+        rules = RecordingRules(include=['/request/'])
+        self.assertTrue(rules.should_record('GET', '/request/priority/'))
+        self.assertFalse(rules.should_record('GET', '/'))
+
+    def test_sample_rates_use_longest_prefix(self):
+        """ Test path sample rates """
+        rules = RecordingRules(sample_rates={'/admin/': 0.5,
+                                             '/admin/hello/': 0,
+                                             '/login/': 0.25})
+        self.assertEqual(rules.rate('GET', '/admin/auth/user/'), 0.5)
+        self.assertEqual(rules.rate('GET', '/admin/hello/about/1/'), 0)
+        self.assertEqual(rules.rate('GET', '/login/'), 0.25)
+        self.assertEqual(rules.rate('GET', '/'), 1)
+
+    def test_method_rates(self):
+        """ Test method rates """
+        rules = RecordingRules(method_rates={'head': 0, 'POST': 0.5},
+                               sample_rates={'/edit/': 0.5})
+        self.assertFalse(rules.should_record('HEAD', '/'))
+        self.assertEqual(rules.rate('POST', '/edit/1/'), 0.25)
+
+    def test_middleware_skips_static_files(self):
+        """ Test static and ajax requests are not recorded """
+        AllRequest.objects.all().delete()
+        self.client.get('/static/css/style.css')
+        self.client.get(reverse('ajax_list'))
+        self.assertEqual(AllRequest.objects.count(), 0)
+
+
+class AnalyticsTest(TestCase):
+    """ Unit tests for live request stats and analytics views """
+    def test_recorded_requests_are_counted(self):
+        """ Test written requests are added to the stats """
+        RequestMinuteStat.objects.all().delete()
+        self.client.get(reverse('about'))
+        self.client.get(reverse('about'))
+        stat = RequestMinuteStat.objects.get(path=reverse('about'))
+        self.assertEqual(stat.count, 2)
+        self.assertEqual(RequestHourStat.objects.get(
+            path=reverse('about')).count, 2)
+
+    def test_compact_doesnt_count_twice(self):
+        """ Test compaction leaves the stats of counted rows alone """
+        self.client.get(reverse('about'))
+        AllRequest.objects.update(date=timezone.now() - timedelta(days=2))
+        compact(timezone.now() - timedelta(days=1))
+        self.assertEqual(RequestMinuteStat.objects.get(
+            path=reverse('about')).count, 1)
+
+    def test_compact_counts_uncounted_rows(self):
+        """ Test rows the live stats missed are counted when compacted """
+        RequestMinuteStat.objects.all().delete()
+        old = timezone.now() - timedelta(days=2)
+        writer = BufferedWriter(AllRequest, size=10, interval=500,
+                                threaded=False)
+        writer.before_write.append(lambda rows: 1 / 0)
+        writer.add(AllRequest(method='GET', path='/a/', date=old))
+        writer.flush()
+        AllRequest.objects.create(method='GET', path='/a/', date=old)
+        import_rows([(old, 'GET', '/a/', 0)])
+        compact(timezone.now() - timedelta(days=1))
+        self.assertEqual(RequestMinuteStat.objects.get(path='/a/').count, 3)
+
+    def test_top_requests(self):
+        """ Test most requested paths """
+        for path in ('/a/', '/b/', '/b/'):
+            self.client.get(path)
+        response = self.client.get(reverse('analytics_top'),
+                                   {'limit': 2})
+        self.assertEqual(json.loads(response.content),
+                         [{'path': '/b/', 'count': 2},
+                          {'path': '/a/', 'count': 1}])
+
+    def test_request_rate(self):
+        """ Test requests per minute by method """
+        self.client.get('/a/')
+        self.client.post('/a/')
+        response = self.client.get(reverse('analytics_rate'),
+                                   {'by': 'method', 'minutes': 5})
+        data = json.loads(response.content)
+        self.assertEqual([(row['method'], row['total']) for row in data],
+                         [('GET', 1), ('POST', 1)])
+
+    def test_bad_parameters(self):
+        """ Test analytics views reject bad parameters """
+        for url, params in (('analytics_top', {'by': 'date'}),
+                            ('analytics_top', {'minutes': 'x'}),
+                            ('analytics_top', {'limit': -1}),
+                            ('analytics_top', {'limit': 0}),
+                            ('analytics_top', {'minutes': 100000000000}),
+                            ('analytics_rate', {'minutes': 100000000000}),
+                            ('analytics_rate', {'minutes': -5}),
+                            ('analytics_rate', {'resolution': 'day'})):
+            response = self.client.get(reverse(url), params)
+            self.assertEqual(response.status_code, 400)
+
+
+class ViewStatsTest(TestCase):
+    """ Unit tests for the view stats middleware and query budgets """
+    def setUp(self):
+        view_stats.reset()
+
+    def test_histogram_percentiles(self):
+        """ Test percentiles of a histogram """
+        histogram = Histogram(COUNT_BOUNDS)
+        self.assertIsNone(histogram.percentile(50))
+        for value in range(1, 101):
+            histogram.add(value)
+        self.assertEqual(histogram.percentile(50), 50)
+        self.assertTrue(95 <= histogram.percentile(95) <= 100)
+        self.assertEqual(histogram.percentile(100), 100)
+        self.assertEqual(histogram.summary()['mean'], 50.5)
+        histogram = Histogram(TIME_BOUNDS)
+        histogram.add(12.3)
+        self.assertEqual(histogram.percentile(99), 12.3)
+
+    def test_views_are_recorded_per_url_name(self):
+        """ Test every request is counted under its URL name """
+        self.client.get(reverse('request_priority'))
+        self.client.get(reverse('request_priority'))
+        self.client.get('/no/such/page/')
+        response = self.client.get(reverse('view_stats'))
+        data = json.loads(response.content)
+        stats = data['request_priority']
+        self.assertEqual(stats['count'], 2)
+        self.assertTrue(stats['queries']['max'] > stats['view_queries']['max'])
+        self.assertTrue(stats['view_queries']['p50'] >= 1)
+        self.assertTrue(stats['time_ms']['p99'] >= stats['db_ms']['p50'])
+        self.assertEqual(data['(unresolved)']['count'], 1)
+        self.assertNotIn('view_stats', data)
+
+    def test_debug_cursor_is_restored(self):
+        """ Test queries are not kept after the request with DEBUG off """
+        self.client.get(reverse('request_priority'))
+        self.assertIsNone(connection.use_debug_cursor)
+        self.assertEqual(connection.queries, [])
+
+    @override_settings(VIEW_QUERY_BUDGETS={'request_priority': 0})
+    def test_budget_fails_in_strict_mode(self):
+        """ Test a view over its query budget raises in strict mode """
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('request_priority'))
+        with self.settings(VIEW_QUERY_BUDGETS_STRICT=False):
+            response = self.client.get(reverse('request_priority'))
+        self.assertEqual(response.status_code, 200)
+
+
+class ExportTest(TestCase):
+    """ Unit tests for request log export """
+    def setUp(self):
+        AllRequest.objects.all().delete()
+        self.day = timezone.now().replace(year=2015, month=3, day=1,
+                                          hour=10, minute=0, second=0,
+                                          microsecond=0)
+        for days, priority in ((0, 0), (1, 5), (2, 5), (3, 1), (4, 9)):
+            AllRequest.objects.create(method='GET', path='/%d/' % days,
+                                      priority=priority,
+                                      date=self.day + timedelta(days=days))
+        self.client.login(username='admin', password='1')
+
+    def test_iter_rows_reads_in_chunks(self):
+        """ Test rows come in id order, one query per chunk """
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(iter_rows(export_queryset(), chunk_size=2))
+        self.assertEqual([row[3] for row in rows],
+                         ['/0/', '/1/', '/2/', '/3/', '/4/'])
+        selects = [query['sql'] for query in queries.captured_queries
+                   if '"hello_allrequest"."path"' in query['sql']]
+        self.assertEqual(len(selects), 3)
+        self.assertTrue(all('LIMIT 2' in sql for sql in selects))
+
+    def test_export_csv_with_filters(self):
+        """ Test CSV export filtered by date and priority """
+        response = self.client.get(reverse('export_requests'),
+                                   {'start': '2015-03-02',
+                                    'end': '2015-03-04',
+                                    'min_priority': 2})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = ''.join(response.streaming_content).splitlines()
+        self.assertEqual(lines[0], 'id,date,method,path,priority')
+        self.assertEqual([line.split(',')[3] for line in lines[1:]],
+                         ['/1/', '/2/'])
+
+    def test_export_ndjson(self):
+        """ Test NDJSON export """
+        response = self.client.get(reverse('export_requests'),
+                                   {'format': 'ndjson', 'priority': 9})
+        rows = [json.loads(line) for line in
+                ''.join(response.streaming_content).splitlines()]
+        self.assertEqual([(row['path'], row['priority']) for row in rows],
+                         [('/4/', 9)])
+
+    def test_export_bad_parameters(self):
+        """ Test export rejects unknown formats and bad dates """
+        for params in ({'format': 'xml'}, {'start': 'yesterday'},
+                       {'priority': 'high'}):
+            response = self.client.get(reverse('export_requests'), params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_export_command(self):
+        """ Test export_requests command """
+        out = StringIO()
+        call_command('export_requests', format='ndjson', min_priority='5',
+                     stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+    def test_export_rejects_empty_chunks(self):
+        """ Test chunks below one row, which would never finish """
+        for chunk in (0, -1):
+            self.assertRaises(CommandError, call_command, 'export_requests',
+                              chunk=chunk, stdout=StringIO())
+            self.assertRaises(ValueError, list,
+                              iter_rows(export_queryset(), chunk))
+
+
+class ImportTest(TestCase):
+    """ Unit tests for request log import """
+    def setUp(self):
+        AllRequest.objects.all().delete()
+        SignalData.objects.all().delete()
+
+    def test_import_validates_priority(self):
+        """ Test rows outside the priority validators are rejected """
+        date = timezone.now().replace(microsecond=0)
+        rows = [(date, 'GET', '/a/', 1), (date, 'GET', '/b/', 10),
+                (date, 'POST', '/c/', '-1'), (date, 'GET', '/d/', 'x')]
+        self.assertEqual(import_rows(iter(rows), chunk_size=3), (1, 3))
+        self.assertEqual(list(AllRequest.objects.values_list('path', 'date')),
+                         [('/a/', date)])
+        self.assertEqual(SignalData.objects.count(), 0)
+        self.assertEqual(RequestMinuteStat.objects.get(path='/a/').count, 1)
+
+    def test_import_fills_missing_dates(self):
+        """ Test rows without a date get the time of the import """
+        before = timezone.now()
+        out = StringIO()
+        with NamedTemporaryFile() as dump:
+            dump.write('{"method": "GET", "path": "/a/"}\n'
+                       '{"method": "GET", "path": "/b/", "date": ""}\n')
+            dump.flush()
+            call_command('import_requests', dump.name, stdout=out)
+        self.assertIn('Imported 2 requests', out.getvalue())
+        self.assertFalse(AllRequest.objects.filter(date__isnull=True))
+        self.assertEqual(AllRequest.objects.filter(date__gte=before).count(),
+                         2)
+
+    def test_import_goes_on_after_bad_lines(self):
+        """ Test lines after one that can't be read are imported """
+        out = StringIO()
+        with NamedTemporaryFile() as dump:
+            dump.write('{"method": "GET", "path": "/a/"}\n'
+                       'not json\n'
+                       '{"method": "GET", "path": 5}\n'
+                       '5\n'
+                       '{"method": "GET", "path": "/b/", "priority": 1e400}\n'
+                       '{"method": "GET", "path": "/c/"}\n')
+            dump.flush()
+            call_command('import_requests', dump.name, stdout=out)
+        self.assertIn('Imported 2 requests, rejected 4', out.getvalue())
+        self.assertEqual(sorted(AllRequest.objects.values_list('path',
+                                                               flat=True)),
+                         ['/a/', '/c/'])
+
+    def test_parse_access_log_skips_bad_lines(self):
+        """ Test an access log line that doesn't match is one None """
+        line = ('127.0.0.1 - - [10/Oct/2000:13:55:36 -0700] '
+                '"GET /%s HTTP/1.0" 200 2326\n')
+        rows = list(parse_access_log([line % 'a', 'garbage\n', line % 'b']))
+        self.assertEqual(rows[1], None)
+        self.assertEqual([row[2] for row in rows if row], ['/a', '/b'])
+
+    def test_parse_access_log(self):
+        """ Test common log format lines """
+        rows = list(parse_access_log([
+            '127.0.0.1 - frank [10/Oct/2000:13:55:36 -0700] '
+            '"GET /apache_pb.gif HTTP/1.0" 200 2326 "-" "Mozilla/4.08"\n',
+            '127.0.0.1 - - [10/Oct/2000:13:55:36 -0700] '
+            '"GET /x?a=1 HTTP/1.0" 200 2326\n']))
+        self.assertEqual(rows[0][1:], ('GET', '/apache_pb.gif', 0))
+        self.assertEqual(rows[0][0].hour, 20)
+        self.assertEqual(rows[1][2], '/x')
+
+    def test_import_rejects_empty_chunks(self):
+        """ Test chunks below one row, which would import nothing """
+        for chunk in (0, -1):
+            self.assertRaises(CommandError, call_command, 'import_requests',
+                              chunk=chunk, stdout=StringIO())
+            self.assertRaises(ValueError, import_rows,
+                              [(None, 'GET', '/', 0)], chunk)
+
+    def test_import_command_reads_export(self):
+        """ Test an NDJSON export can be imported again """
+        for path in ('/a/', '/b/'):
+            AllRequest.objects.create(method='GET', path=path, priority=3)
+        out = StringIO()
+        call_command('export_requests', format='ndjson', stdout=out)
+        with NamedTemporaryFile() as dump:
+            dump.write(out.getvalue() + '{"method": "GET"}\n')
+            dump.flush()
+            out = StringIO()
+            call_command('import_requests', dump.name, stdout=out)
+        self.assertIn('Imported 2 requests, rejected 1', out.getvalue())
+        self.assertEqual(AllRequest.objects.filter(priority=3).count(), 4)
+
+
+class BulkPriorityTest(TestCase):
+    """ Unit tests for bulk priority editing """
+    def setUp(self):
+        AllRequest.objects.all().delete()
+        for method, path in (('GET', '/a/1'), ('POST', '/a/2'),
+                             ('GET', '/b/'), ('GET', '/static/x.css')):
+            AllRequest.objects.create(method=method, path=path)
+        SignalData.objects.all().delete()
+        self.client.login(username='admin', password='1')
+
+    def priorities(self):
+        return dict(AllRequest.objects.values_list('path', 'priority'))
+
+    def test_set_priority_by_path_and_method(self):
+        """ Test one UPDATE changes the matching requests """
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(set_priority(4, path='/a/', method='get'), 1)
+        updates = [query for query in queries.captured_queries
+                   if 'UPDATE "hello_allrequest"' in query['sql']]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('REGEXP', updates[0]['sql'])
+        self.assertEqual(self.priorities(), {'/a/1': 4, '/a/2': 0,
+                                             '/b/': 0, '/static/x.css': 0})
+        self.assertEqual(list(SignalData.objects.values_list('message',
+                                                             flat=True)),
+                         ["Update 1 rows in AllRequest where path starts "
+                          "with '/a/' and method is 'GET', priority 4"])
+
+    def test_set_priority_by_regex_and_ids(self):
+        """ Test regex paths and ids, unchanged rows are not counted """
+        self.assertEqual(set_priority(2, path=r'^/.*\.css$'), 1)
+        ids = AllRequest.objects.values_list('pk', flat=True)
+        self.assertEqual(set_priority(2, ids=list(ids)), 3)
+        self.assertEqual(set(self.priorities().values()), set([2]))
+        self.assertEqual(SignalData.objects.count(), 2)
+
+    def test_audit_row_names_a_few_ids(self):
+        """ Test the audit row of many ids stays short """
+        ids = list(AllRequest.objects.values_list('pk', flat=True))
+        set_priority(3, ids=ids + range(10 ** 6, 10 ** 6 + 10000))
+        message = SignalData.objects.get().message
+        self.assertIn('10004 ids', message)
+        self.assertLess(len(message), 200)
+
+    def test_bulk_form_redirects_back(self):
+        """ Test checked requests of the priority list """
+        pk = AllRequest.objects.get(path='/b/').pk
+        response = self.client.post(reverse('bulk_priority'),
+                                    {'ids': [pk], 'priority': 7,
+                                     'next': '/request/priority/?page=1'})
+        self.assertRedirects(response, '/request/priority/?page=1')
+        self.assertEqual(self.priorities()['/b/'], 7)
+
+    def test_bulk_form_errors(self):
+        """ Test bulk form needs a selection and a valid priority """
+        response = self.client.post(reverse('bulk_priority'),
+                                    {'priority': 10})
+        self.assertContains(response, 'Choose requests by id')
+        self.assertContains(response, 'less than or equal to 9')
+
+    def test_json_api(self):
+        """ Test bulk priority JSON API """
+        response = self.client.post(reverse('ajax_bulk_priority'),
+                                    json.dumps({'priority': 1,
+                                                'path': '/a/'}),
+                                    content_type='application/json')
+        self.assertEqual(json.loads(response.content), {'updated': 2})
+        response = self.client.post(reverse('ajax_bulk_priority'),
+                                    json.dumps({'priority': 1,
+                                                'ids': ['x']}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ids', json.loads(response.content))
+
+
+class PriorityRulesTest(TestCase):
+    """ Unit tests for automatic priority rules """
+    def test_first_matching_rule_wins(self):
+        """ Test rules are tried in order """
+        rules = PriorityRules([('^/admin/jsi18n/$', '', 0),
+                               ('/admin/', '', 9),
+                               ('', 'post', 5)])
+        self.assertEqual(rules.priority('GET', '/admin/jsi18n/'), 0)
+        self.assertEqual(rules.priority('POST', '/admin/auth/'), 9)
+        self.assertEqual(rules.priority('POST', '/edit/1/'), 5)
+        self.assertEqual(rules.priority('GET', '/edit/1/'), 0)
+        self.assertEqual(rules.priority('PUT', '/', default=None), None)
+
+    def test_many_rules(self):
+        """ Test more rules than groups allowed in one regex """
+        rules = PriorityRules([('/p%d/' % i, '', i % 10)
+                               for i in range(250)])
+        self.assertEqual(rules.priority('GET', '/p247/x'), 7)
+
+    def test_rules_with_groups(self):
+        """ Test groups of the rules count against the group limit """
+        rules = PriorityRules([('^/p%d/(a)(b)(c)$' % i, '', i % 10)
+                               for i in range(90)])
+        self.assertEqual(rules.priority('GET', '/p88/abc'), 8)
+        self.assertEqual(rules.priority('GET', '/p88/x'), 0)
+
+    def test_middleware_applies_rules(self):
+        """ Test recorded requests get the priority of their rule """
+        AllRequest.objects.all().delete()
+        self.client.get('/request/priority/')
+        rule = PriorityRule.objects.create(path='/request/', priority=3)
+        self.client.get('/request/priority/')
+        rule.delete()
+        self.client.get('/request/priority/')
+        self.assertEqual(list(AllRequest.objects.order_by('id')
+                              .values_list('priority', flat=True)),
+                         [0, 3, 0])
+
+    def test_rule_table_sees_rules_saved_elsewhere(self):
+        """ Test compiled rules follow the shared generation """
+        table = PriorityRuleTable()
+        self.assertEqual(table.priority('GET', '/x/'), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(table.priority('GET', '/x/'), 0)
+        # saved by another process, the table only sees the cache
+        PriorityRule.objects.create(path='/x/', priority=4)
+        self.assertEqual(table.priority('GET', '/x/'), 4)
+
+    def test_apply_rules_updates_each_row_once(self):
+        """ Test retroactive rules, one UPDATE per rule """
+        AllRequest.objects.all().delete()
+        for method, path in (('GET', '/admin/'), ('POST', '/admin/'),
+                             ('POST', '/edit/'), ('GET', '/')):
+            AllRequest.objects.create(method=method, path=path)
+        with CaptureQueriesContext(connection) as queries:
+            counts = apply_rules([('/admin/', 'GET', 9), ('', 'POST', 5)])
+        self.assertEqual(counts, [1, 2])
+        self.assertEqual(len([query for query in queries.captured_queries
+                              if 'UPDATE' in query['sql']]), 2)
+        self.assertEqual(list(AllRequest.objects.order_by('id')
+                              .values_list('priority', flat=True)),
+                         [9, 5, 5, 0])
+
+    def test_apply_many_rules(self):
+        """ Test each row gets the first of many rules it matches """
+        AllRequest.objects.all().delete()
+        for path in ('/p/5/', '/p/150/', '/q/'):
+            AllRequest.objects.create(method='GET', path=path)
+        rules = [('/p/%d/' % number, '', number % 10)
+                 for number in range(200)] + [('', '', 9)]
+        counts = apply_rules(rules)
+        self.assertEqual((counts[5], counts[150], counts[-1]), (1, 0, 1))
+        self.assertEqual(list(AllRequest.objects.order_by('id')
+                              .values_list('priority', flat=True)),
+                         [5, 0, 9])
+
+    def test_apply_rules_agrees_with_live_rules(self):
+        """ Test stored requests match prefixes case sensitively """
+        AllRequest.objects.all().delete()
+        for path in ('/Admin/', '/admin/'):
+            AllRequest.objects.create(method='GET', path=path)
+        rules = [('/admin/', '', 9)]
+        self.assertEqual(apply_rules(rules), [1])
+        live = PriorityRules(rules)
+        for path, priority in AllRequest.objects.values_list('path',
+                                                             'priority'):
+            self.assertEqual(priority, live.priority('GET', path))
+
+    def test_apply_priority_rules_command(self):
+        """ Test apply_priority_rules command """
+        AllRequest.objects.create(method='GET', path='/a/')
+        PriorityRule.objects.create(path='/a/', priority=2)
+        out = StringIO()
+        call_command('apply_priority_rules', stdout=out)
+        self.assertIn('Updated 1 requests', out.getvalue())
+
+
+class RowCounterTest(TestCase):
+    """ Unit tests for maintained row counters """
+    def setUp(self):
+        AllRequest.objects.create(method='GET', path='/a/')
+
+    def assertCount(self, expected):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(row_count(AllRequest), expected)
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'COUNT(' in query['sql']])
+
+    def test_counter_follows_saves_and_deletes(self):
+        """ Test counter is read instead of counting the table """
+        self.assertEqual(row_count(AllRequest), AllRequest.objects.count())
+        total = AllRequest.objects.count()
+        AllRequest.objects.create(method='GET', path='/b/')
+        self.assertCount(total + 1)
+        AllRequest.objects.filter(path='/a/').delete()
+        self.assertCount(total)
+
+    def test_counter_follows_bulk_writes(self):
+        """ Test writers, imports and compaction keep the counter """
+        total = row_count(AllRequest)
+        writer = BufferedWriter(AllRequest, size=10, interval=500,
+                                threaded=False)
+        writer.add(AllRequest(method='GET', path='/b/'))
+        writer.add(AllRequest(method='GET', path='/c/'))
+        writer.flush()
+        old = timezone.now() - timedelta(days=2)
+        import_rows([(old, 'GET', '/d/', 0)])
+        self.assertCount(total + 3)
+        compact(timezone.now() - timedelta(days=1))
+        self.assertCount(total + 2)
+        self.assertEqual(row_count(AllRequest), AllRequest.objects.count())
+
+
 class LoginTest(TestCase):
     """ Unit tests for Login """
     def test_login_page_available(self):
@@ -283,6 +1437,7 @@ class EditPersonTest(TestCase):
         image = Image.new('RGB', (100, 100))
         tmp_file = NamedTemporaryFile(suffix='.jpg')
         image.save(tmp_file)
+        tmp_file.seek(0)
         self.client.post(reverse('edit', kwargs={'pk': 1}),
                          {'name': 'Somebody',
                           'last_name': 'Unknown',
@@ -327,6 +1482,141 @@ class EditPersonTest(TestCase):
         self.assertTrue('This field is required' in response.content)
 
 
+class PhotoMixin(object):
+    """ About 1 with a stored photo, files removed afterwards """
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        output = StringIO()
+        Image.new('RGB', (1000, 600), 'red').save(output, 'PNG')
+        self.person = About.objects.get(pk=1)
+        self.person.image.save('test-photo.png',
+                               ContentFile(output.getvalue()))
+        self.stored = [self.person.image.name]
+
+    def tearDown(self):
+        self.stored += self.person.renditions.values_list('image', flat=True)
+        for name in self.stored:
+            default_storage.delete(name)
+
+
+class ImageProcessingTest(PhotoMixin, TestCase):
+    """ Unit tests for profile photo renditions """
+    def test_process_swaps_in_renditions(self):
+        """ Test renditions replace the shown image """
+        process(self.person)
+        person = About.objects.get(pk=1)
+        self.assertEqual(person.image_original.name, self.stored[0])
+        self.assertEqual([(r.width, r.format)
+                          for r in person.renditions.all()],
+                         [(size, format) for size in (200, 400)
+                          for format in images.rendition_formats()])
+        self.assertEqual(person.image.name,
+                         person.renditions.all()[0].image.name)
+        shown = Image.open(default_storage.open(person.image.name))
+        self.assertEqual(shown.size, (200, 200))
+        self.assertTrue(shown.info.get('progressive'))
+
+    def test_outdated_renditions_are_dropped(self):
+        """ Test renditions of a replaced original are thrown away """
+        About.objects.filter(pk=1).update(image_original='imag/newer.jpg')
+        renditions = render(self.stored[0], [50], ['JPEG'], 90)
+        swap(1, self.stored[0], renditions)
+        self.assertFalse(default_storage.exists(renditions[0][2]))
+        self.assertEqual(About.objects.get(pk=1).renditions.count(), 0)
+
+    def test_replaced_original_is_deleted(self):
+        """ Test a new upload removes the original it replaces """
+        process(self.person)
+        output = StringIO()
+        Image.new('RGB', (300, 300), 'blue').save(output, 'PNG')
+        # as the edit view does, which reads it again
+        self.person = About.objects.get(pk=1)
+        self.person.image.save('test-photo-2.png',
+                               ContentFile(output.getvalue()))
+        self.stored.append(self.person.image.name)
+        process(self.person)
+        self.assertFalse(default_storage.exists(self.stored[0]))
+        self.assertEqual(About.objects.get(pk=1).image_original.name,
+                         self.stored[1])
+
+    def test_failed_render_is_made_on_demand(self):
+        """ Test an upload that can't be rendered isn't pending forever """
+        About.objects.filter(pk=1).update(image_original=self.stored[0])
+        swap(1, self.stored[0], None)
+        person = About.objects.get(pk=1)
+        self.assertFalse(person.image_original)
+        self.assertEqual(person.image.name, self.stored[0])
+
+    @override_settings(IMAGE_WORKERS=1)
+    def test_render_in_worker_process(self):
+        """ Test renditions are made by the process pool """
+        renditions = pool().apply(render, (self.stored[0], [64], ['JPEG'],
+                                           80))
+        images._pool.terminate()
+        images._pool = None
+        self.stored += [name for _, _, name in renditions]
+        self.assertEqual(Image.open(default_storage.open(
+            renditions[0][2])).size, (64, 64))
+
+
+class ProfileImageTagTest(PhotoMixin, TestCase):
+    """ Unit tests for the profile_image template tag """
+    template = Template('{% load profile-image %}'
+                        '{% profile_image person "100vw" "photo" %}')
+
+    def tearDown(self):
+        super(ProfileImageTagTest, self).tearDown()
+        for name in getattr(self, 'generated', []):
+            default_storage.delete(name)
+
+    def test_tag_uses_renditions(self):
+        """ Test srcsets of the worker renditions """
+        process(self.person)
+        person = About.objects.get(pk=1)
+        html = self.template.render(Context({'person': person}))
+        urls = dict((format, [rendition.image.url for rendition
+                              in person.renditions.filter(format=format)])
+                    for format in images.rendition_formats())
+        jpeg = urls.pop('JPEG')
+        self.assertIn('<img class="photo" src="%s" srcset="%s 200w, %s 400w"'
+                      % (jpeg[0], jpeg[0], jpeg[1]), html)
+        for format, (small, large) in urls.items():
+            self.assertIn('<source type="image/%s" srcset="%s 200w, %s 400w" '
+                          'sizes="100vw">' % (format.lower(), small, large),
+                          html)
+
+    def test_tag_shows_upload_until_renditions_are_made(self):
+        """ Test pending renditions are not made during the request """
+        About.objects.filter(pk=1).update(
+            image_original=self.person.image.name)
+        person = About.objects.get(pk=1)
+        html = self.template.render(Context({'person': person}))
+        self.assertEqual(html, '<img class="photo" src="%s" alt="">'
+                         % person.image.url)
+
+    def test_tag_generates_renditions_once(self):
+        """ Test photos without renditions get imagekit ones, made once """
+        from imagekit.cachefiles import ImageCacheFile
+        generated = []
+        generate = ImageCacheFile._generate
+
+        def counting(cachefile):
+            generated.append(cachefile.name)
+            return generate(cachefile)
+        ImageCacheFile._generate = counting
+        try:
+            context = Context({'person': self.person})
+            html = self.template.render(context)
+            self.assertEqual(self.template.render(context), html)
+        finally:
+            ImageCacheFile._generate = generate
+        self.generated = generated
+        self.assertEqual(len(generated), 2 * len(images.rendition_formats()))
+        self.assertIn('200w', html)
+        self.assertNotIn('800w', html)
+
+
 class TagTest(TestCase):
     """ Unit tests for own tag"""
     fixtures = ['initial_data.json']
@@ -338,6 +1628,64 @@ class TagTest(TestCase):
         self.assertContains(response,
                             '<a href="/admin/hello/about/1/">(admin)</a>')
 
+    def test_admin_links_without_queries(self):
+        """ Test links of a whole list are built without queries """
+        requests = [AllRequest(pk=pk) for pk in (3, 4)]
+        template = Template('{% load admin-link %}'
+                            '{% edit_links requests as links %}'
+                            '{% for req, url in links %}{{ url }} {% endfor %}'
+                            '{% edit_link person %}')
+        context = Context({'requests': requests,
+                           'person': About.objects.get(pk=1)})
+        with self.assertNumQueries(0):
+            html = template.render(context)
+        self.assertEqual(html, '/admin/hello/allrequest/3/ '
+                               '/admin/hello/allrequest/4/ '
+                               '/admin/hello/about/1/')
+
+    def test_admin_links_follow_urlconf(self):
+        """ Test the link map is rebuilt when the URLconf is reloaded """
+        links = import_module('apps.hello.templatetags.admin-link')
+        first = links.admin_links()
+        self.assertIs(links.admin_links(), first)
+        clear_url_caches()
+        self.assertIsNot(links.admin_links(), first)
+
+    def test_request_rows_are_cached_per_priority(self):
+        """ Test request_rows renders a row again only for a new priority """
+        req = AllRequest.objects.create(path='/cached/', method='GET',
+                                        priority=1)
+        template = Template('{% load request-rows %}'
+                            '{% request_rows requests name %}')
+        context = {'requests': [req],
+                   'name': 'hello/request_priority_row.html'}
+        html = template.render(Context(context))
+        self.assertIn('/cached/', html)
+        self.assertIn('href="%s"' % reverse('edit_request', args=(req.pk,)),
+                      html)
+        req.path = '/changed/'
+        with self.assertNumQueries(0):
+            self.assertEqual(template.render(Context(context)), html)
+        req.priority = 2
+        self.assertIn('/changed/', template.render(Context(context)))
+
+    def test_request_rows_without_date(self):
+        """ Test request pages show requests without a date """
+        AllRequest.objects.create(path='/undated/', method='GET', date=None)
+        for name in ('request_list', 'request_priority'):
+            response = self.client.get(reverse(name))
+            self.assertContains(response, '/undated/')
+
+    def test_request_pages_link_rows(self):
+        """ Test request pages link every row to its edit page """
+        req = AllRequest.objects.create(path='/row/', method='GET')
+        url = reverse('edit_request', args=(req.pk,))
+        for name in ('request_list', 'request_priority'):
+            response = self.client.get(reverse(name))
+            self.assertContains(response, '<a href="%s">Edit</a>' % url)
+        response = self.client.get(url)
+        self.assertContains(response, 'action="%s"' % url)
+
 
 class OwnCommandTest(TestCase):
     """ Unit tests for own management command - count_objects"""
@@ -350,6 +1698,34 @@ class OwnCommandTest(TestCase):
         self.assertIn("Error: Model About has 1 objects", out.getvalue())
         self.assertIn("Error: Model User has 1 objects", out.getvalue())
 
+    def test_command_counts_each_model_once(self):
+        """ Test one COUNT per model """
+        with CaptureQueriesContext(connection) as queries:
+            call_command('count_objects', stdout=StringIO(),
+                         stderr=StringIO())
+        counts = [query for query in queries.captured_queries
+                  if 'COUNT(*)' in query['sql']]
+        self.assertEqual(len(counts), len(models.get_models()))
+
+    def test_command_json_format(self):
+        """ Test JSON output of chosen models """
+        out = StringIO()
+        call_command('count_objects', 'About', 'auth.user', format='json',
+                     stdout=out)
+        self.assertEqual(json.loads(out.getvalue()),
+                         [{'app': 'auth', 'model': 'User', 'count': 1,
+                           'exact': True},
+                          {'app': 'hello', 'model': 'About', 'count': 1,
+                           'exact': True}])
+
+    def test_command_fast_uses_table_statistics(self):
+        """ Test --fast reads sqlite_stat1 after ANALYZE """
+        connection.cursor().execute('ANALYZE')
+        out = StringIO()
+        call_command('count_objects', 'About', fast=True, stdout=out,
+                     stderr=StringIO())
+        self.assertIn('Model About has about 1 objects', out.getvalue())
+
 
 class SignalDataTest(TestCase):
     """ Unit tests for SignalData"""
@@ -357,7 +1733,7 @@ class SignalDataTest(TestCase):
     def test_post_create(self):
         """ Test create signal """
         SignalData.objects.all().delete()
-        self.client.get(reverse('about'))
+        AllRequest.objects.create(method='GET', path='/')
         self.assertEqual(SignalData.objects.count(), 1)
         log_info = SignalData.objects.get(pk=1).message
         self.assertEqual(log_info, "Create row with id 1 in AllRequest")
@@ -369,7 +1745,7 @@ class SignalDataTest(TestCase):
         data = {'priority': 1}
         self.client.post(reverse('edit_request',
                                  kwargs={'pk': 1}), data)
-        log_info = SignalData.objects.get(pk=3).message
+        log_info = SignalData.objects.get(pk=1).message
         self.assertEqual(log_info, "Update row with id 1 in AllRequest")
 
     def test_post_delete(self):
@@ -377,6 +1753,174 @@ class SignalDataTest(TestCase):
         SignalData.objects.all().delete()
         self.client.get(reverse('about'))
         AllRequest.objects.all().delete()
-        self.assertEqual(SignalData.objects.count(), 2)
-        log_info = SignalData.objects.get(pk=2).message
+        self.assertEqual(SignalData.objects.count(), 1)
+        log_info = SignalData.objects.get(pk=1).message
         self.assertEqual(log_info, "Delete row with id 1 in AllRequest")
+
+    def test_unregistered_model_is_not_logged(self):
+        """ Test only registered models are logged """
+        SignalData.objects.all().delete()
+        User.objects.create(username='somebody')
+        self.assertFalse(audit.is_registered(User))
+        self.assertEqual(SignalData.objects.count(), 0)
+
+    def test_register_model(self):
+        """ Test register and unregister model """
+        SignalData.objects.all().delete()
+        audit.register(User)
+        try:
+            user = User.objects.create(username='somebody')
+        finally:
+            audit.unregister(User)
+        User.objects.filter(pk=user.pk).delete()
+        self.assertEqual(SignalData.objects.get().message,
+                         "Create row with id %d in User" % user.pk)
+
+
+def seed_rows(number):
+    """ ``number`` (date, method, path, priority) rows, one per second """
+    start = timezone.now() - timedelta(seconds=number)
+    for i in xrange(number):
+        yield (start + timedelta(seconds=i), ('GET', 'POST')[i % 7 == 0],
+               '/seed/%d/' % (i % 100), i % 10)
+
+
+class PerformanceTest(TestCase):
+    """ Unit tests for the query counts and timings of every view
+
+    AllRequest is seeded once for the class with PERFORMANCE_TEST_ROWS
+    rows. Query counts are those of the view itself, as measured by
+    ViewStatsMiddleware, with every cache cold. Timings are compared
+    with the PERFORMANCE_BASELINE file for the same number of rows.
+    """
+    fixtures = ['initial_data.json']
+
+    # url name: (method, arguments, data, login, view queries)
+    VIEWS = {
+        'about': ('get', {}, {}, False, 1),
+        'request_list': ('get', {}, {}, False, 1),
+        'ajax_list': ('get', {}, {'since': 5}, False, 2),
+        'ajax_wait': ('get', {}, {'since': 5, 'timeout': 0}, False, 2),
+        'analytics_top': ('get', {}, {}, False, 1),
+        'analytics_rate': ('get', {}, {}, False, 1),
+        'view_stats': ('get', {}, {}, False, 0),
+        'writer_stats': ('get', {}, {}, False, 0),
+        'export_requests': ('get', {}, {}, True, 2),
+        'edit': ('get', {'pk': 1}, {}, True, 3),
+        'login': ('get', {}, {}, False, 0),
+        'logout': ('get', {}, {}, True, 11),
+        'edit_request': ('get', {'pk': 5}, {}, False, 1),
+        'request_priority': ('get', {}, {}, False, 2),
+        'bulk_priority': ('get', {}, {}, True, 2),
+        'ajax_bulk_priority': ('post', {}, {'priority': 9, 'ids': [1, 2]},
+                               True, 5),
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super(PerformanceTest, cls).setUpClass()
+        cls.rows = settings.PERFORMANCE_TEST_ROWS
+        import_rows(seed_rows(cls.rows), settings.REQUEST_IMPORT_CHUNK)
+
+    @classmethod
+    def tearDownClass(cls):
+        # without the delete signals, that would run once per row
+        cursor = connection.cursor()
+        for model in (AllRequest, RequestMinuteStat, RequestHourStat):
+            cursor.execute('DELETE FROM %s' % connection.ops.quote_name(
+                model._meta.db_table))
+        counts.reset(AllRequest)
+        feed.request_feed.invalidate()
+        super(PerformanceTest, cls).tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        feed.request_feed.invalidate()
+        view_stats.reset()
+        # as on a running site, where the counter exists
+        counts.reset(AllRequest)
+
+    def request(self, name, login=True):
+        method, kwargs, data, needs_login, _ = self.VIEWS[name]
+        if needs_login and login:
+            self.client.login(username='admin', password='1')
+        url = reverse(name, kwargs=kwargs)
+        if method == 'post':
+            response = self.client.post(url, json.dumps(data),
+                                        content_type='application/json')
+        else:
+            response = self.client.get(url, data)
+        if response.streaming:
+            ''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, name)
+        return response
+
+    def test_every_view_has_a_query_count(self):
+        """ Test query counts are checked for every named URL """
+        names = set(pattern.name for pattern in hello_urls.urlpatterns
+                    if getattr(pattern, 'name', None))
+        self.assertEqual(names, set(self.VIEWS))
+
+    def test_view_query_counts(self):
+        """ Test the number of queries of every view """
+        for name in sorted(self.VIEWS):
+            cache.clear()
+            feed.request_feed.invalidate()
+            self.client.logout()
+            view_stats.reset()
+            self.request(name)
+            queries = view_stats.snapshot()[name]['view_queries']['max']
+            self.assertEqual(queries, self.VIEWS[name][-1],
+                             '%s ran %d queries, expected %d'
+                             % (name, queries, self.VIEWS[name][-1]))
+
+    @skipUnless(connection.vendor == 'sqlite', 'reads SQLite query plans')
+    def test_request_queries_use_indexes(self):
+        """ Test AllRequest pages are read in index order, never sorted """
+        requests = AllRequest.objects.all()
+        queries = [query() for _, query in BENCHMARK_QUERIES] + [
+            requests.order_by('-id')[:100],
+            requests.filter(id__gt=5).order_by('-id')[:10],
+            requests.order_by('-priority', '-pk')[:11],
+            requests.filter(priority__lte=5).filter(
+                Q(priority__lt=5) | Q(pk__lt=500)).order_by(
+                '-priority', '-pk')[:11],
+            requests.order_by('priority', 'pk')[:11],
+        ]
+        cursor = connection.cursor()
+        for queryset in queries:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+            self.assertNotIn('TEMP B-TREE', plan, '%s: %s' % (sql, plan))
+
+    def test_view_timings(self):
+        """ Test views are not slower than the baseline allows """
+        with open(settings.PERFORMANCE_BASELINE) as baseline_file:
+            baseline = json.load(baseline_file)
+        expected = baseline['timings'].get(str(self.rows), {})
+        measured = {}
+        for name in sorted(self.VIEWS):
+            if self.VIEWS[name][0] != 'get':
+                continue
+            # logs in, which hashes the password, and warms the caches
+            self.request(name)
+            best = None
+            for _ in range(5):
+                started = time.time()
+                self.request(name, login=False)
+                elapsed = (time.time() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            measured[name] = round(best, 2)
+        if settings.PERFORMANCE_BASELINE_WRITE:
+            baseline['timings'][str(self.rows)] = measured
+            with open(settings.PERFORMANCE_BASELINE, 'w') as baseline_file:
+                json.dump(baseline, baseline_file, indent=4, sort_keys=True,
+                          separators=(',', ': '))
+            return
+        for name, milliseconds in sorted(expected.items()):
+            limit = max(milliseconds * baseline['tolerance'],
+                        milliseconds + baseline['slack_ms'])
+            self.assertLessEqual(measured[name], limit,
+                                 '%s took %.2fms, the baseline allows %.2fms'
+                                 % (name, measured[name], limit))
@@ -6,19 +6,36 @@ from django.core.urlresolvers import reverse_lazy
 
 urlpatterns = patterns(
     '',
-    url(r'^$', 'hello.views.all_people', name='about'),
-    url(r'^request/$', 'hello.views.request_list', name='request_list'),
-    url(r'^request/ajax_request_list$', 'hello.views.ajax_request_list',
+    url(r'^$', 'apps.hello.views.all_people', name='about'),
+    url(r'^request/$', 'apps.hello.views.request_list', name='request_list'),
+    url(r'^request/ajax_request_list$', 'apps.hello.views.ajax_request_list',
         name='ajax_list'),
-    url(r'^edit/(?P<pk>[0-9]+)/$', 'hello.views.edit_person', name='edit'),
+    url(r'^request/ajax_request_wait$', 'apps.hello.views.ajax_request_wait',
+        name='ajax_wait'),
+    url(r'^request/analytics/top$', 'apps.hello.views.ajax_top_requests',
+        name='analytics_top'),
+    url(r'^request/analytics/rate$', 'apps.hello.views.ajax_request_rate',
+        name='analytics_rate'),
+    url(r'^request/stats/views$', 'apps.hello.views.ajax_view_stats',
+        name='view_stats'),
+    url(r'^request/stats/writers$', 'apps.hello.views.ajax_writer_stats',
+        name='writer_stats'),
+    url(r'^request/export$', 'apps.hello.views.export_requests',
+        name='export_requests'),
+    url(r'^edit/(?P<pk>[0-9]+)/$', 'apps.hello.views.edit_person',
+        name='edit'),
     url(r'^login/$', 'django.contrib.auth.views.login',
         {"template_name": "hello/login.html"}, name="login"),
     url(r'^logout/$', 'django.contrib.auth.views.logout',
         {"next_page": reverse_lazy('about')}, name="logout"),
-    url(r'^edit_request/(?P<pk>[0-9]+)/$', 'hello.views.edit_request',
+    url(r'^edit_request/(?P<pk>[0-9]+)/$', 'apps.hello.views.edit_request',
         name='edit_request'),
-    url(r'^request/priority/$', 'hello.views.request_list_priority',
+    url(r'^request/priority/$', 'apps.hello.views.request_list_priority',
         name='request_priority'),
+    url(r'^request/priority/bulk/$',
+        'apps.hello.views.bulk_request_priority', name='bulk_priority'),
+    url(r'^request/api/priority$', 'apps.hello.views.ajax_bulk_priority',
+        name='ajax_bulk_priority'),
 )
 
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -0,0 +1,17 @@
+def memoize(function, size=10000):
+    """ Remember the last ``size`` results of a one argument function
+
+    For dates of requests, which come many per second, so most of them
+    were just parsed or formatted for the row before.
+    """
+    known = {}
+
+    def cached(value):
+        try:
+            return known[value]
+        except KeyError:
+            if len(known) >= size:
+                known.clear()
+            known[value] = result = function(value)
+            return result
+    return cached
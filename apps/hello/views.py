@@ -1,39 +1,181 @@
 import json
+import math
 
 
 from django.shortcuts import render, get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import etag
 from django.http import HttpResponse, HttpResponseRedirect
+from django.http import StreamingHttpResponse
 from django.http import HttpResponseBadRequest
 from django.core.urlresolvers import reverse
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.conf import settings
+from django.utils.http import is_safe_url
 
+from . import analytics, bulk, export, feed, images, serializers
+from .caching import cache_view
 from .models import About, AllRequest
-from .forms import EditPersonForm, EditRequestForm
+from .forms import EditPersonForm, EditRequestForm, BulkPriorityForm
+from .counts import row_count
+from .instrumentation import view_stats
+from .writers import audit_writer, request_writer
+from .pagination import KeysetPaginator, InvalidCursor
 
 
+@cache_view(About)
 def all_people(request):
     people = About.objects.order_by('id')[:1]
     return render(request, 'hello/about.html', {'people': people})
 
 
 def request_list(request):
-    requests = AllRequest.objects.order_by('-date')[:10]
+    requests = feed.request_feed.latest(10)
     return render(request, 'hello/request.html', {'requests': requests})
 
 
+def feed_etag(request):
+    return '%s-%s-%s' % (feed.version(), request.GET.get('since', ''),
+                         request.GET.get('format', ''))
+
+
+def requests_json(requests, format='records'):
+    """ ``requests`` as a list of objects, or one array per field """
+    if format not in serializers.FORMATS:
+        return HttpResponseBadRequest('format must be one of %s' % ', '.join(
+            sorted(serializers.FORMATS)))
+    return HttpResponse(serializers.serialize(requests, format),
+                        content_type="application/json")
+
+
 @csrf_exempt
+@etag(feed_etag)
 def ajax_request_list(request):
-    requests = AllRequest.objects.order_by('-date')[:10]
-    data = [{'req_id': req.id,
-             'req_date': req.date.strftime("%d/%b/%Y %H:%M:%S"),
-             'req_method': req.method,
-             'req_path': req.path,
-             'req_priority': req.priority} for req in requests]
+    try:
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        return HttpResponseBadRequest('since must be a request id')
+    format = request.GET.get('format', 'records')
+    if not since:
+        return requests_json(feed.request_feed.latest(10), format)
+    requests = feed.request_feed.since(since)
+    if requests is None:
+        requests = AllRequest.objects.filter(id__gt=since)
+        requests = requests.order_by('-id')
+    return requests_json(requests[:10], format)
+
+
+@csrf_exempt
+def ajax_request_wait(request):
+    """ Long poll: answers as soon as there are requests newer than since """
+    limit = getattr(settings, 'REQUEST_FEED_TIMEOUT', 25)
+    try:
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        return HttpResponseBadRequest('since must be a request id')
+    try:
+        timeout = float(request.GET.get('timeout', limit))
+    except ValueError:
+        timeout = -1
+    # nan would make the wait never end
+    if math.isnan(timeout) or math.isinf(timeout) or timeout < 0:
+        return HttpResponseBadRequest('timeout must be a number of seconds')
+    timeout = min(timeout, limit)
+    format = request.GET.get('format', 'records')
+    if format not in serializers.FORMATS:
+        # answer right away instead of after the wait
+        return requests_json([], format)
+    requests = feed.request_feed.wait(since, timeout)
+    if requests is None:
+        requests = AllRequest.objects.filter(id__gt=since)
+        requests = requests.order_by('-id')
+    return requests_json(requests[:10], format)
+
+
+def bounded_int(request, name, default, high):
+    """ GET parameter ``name`` as a number from 1 to ``high``, else None """
+    try:
+        value = int(request.GET.get(name, default))
+    except ValueError:
+        return None
+    return value if 1 <= value <= high else None
+
+
+def analytics_minutes(request):
+    return bounded_int(request, 'minutes', 60, getattr(
+        settings, 'REQUEST_ANALYTICS_MAX_MINUTES', 366 * 24 * 60))
+
+
+def ajax_top_requests(request):
+    """ Most requested paths (or methods, priorities) of the last minutes """
+    minutes = analytics_minutes(request)
+    limit = bounded_int(request, 'limit', 10, getattr(
+        settings, 'REQUEST_ANALYTICS_MAX_LIMIT', 1000))
+    if minutes is None or limit is None:
+        return HttpResponseBadRequest('minutes and limit must be positive '
+                                      'numbers')
+    field = request.GET.get('by', 'path')
+    if field not in analytics.GROUPS:
+        return HttpResponseBadRequest('by must be one of %s'
+                                      % ', '.join(analytics.GROUPS))
+    start, end = analytics.time_range(minutes)
+    data = [{field: value, 'count': count} for value, count
+            in analytics.top(field, start, end, limit)]
     return HttpResponse(json.dumps(data), content_type="application/json")
 
 
+def ajax_request_rate(request):
+    """ Requests per minute or hour, optionally split by method or path """
+    minutes = analytics_minutes(request)
+    if minutes is None:
+        return HttpResponseBadRequest('minutes must be a positive number')
+    resolution = request.GET.get('resolution', 'minute')
+    group = request.GET.get('by') or None
+    if resolution not in analytics.RESOLUTIONS or \
+            group not in analytics.GROUPS + (None,):
+        return HttpResponseBadRequest('unknown resolution or grouping')
+    start, end = analytics.time_range(minutes)
+    data = analytics.series(start, end, resolution, group)
+    return HttpResponse(json.dumps(data), content_type="application/json")
+
+
+def ajax_view_stats(request):
+    """ Time and query percentiles of every view of this process """
+    return HttpResponse(json.dumps(view_stats.snapshot(), sort_keys=True),
+                        content_type="application/json")
+
+
+def ajax_writer_stats(request):
+    """ Row counters of the request and audit log writers """
+    data = {'requests': request_writer.stats(), 'audit': audit_writer.stats()}
+    return HttpResponse(json.dumps(data, sort_keys=True),
+                        content_type="application/json")
+
+
+@login_required
+def export_requests(request):
+    """ Stream the request log as CSV or NDJSON
+
+    Takes the same filters as manage.py export_requests: ``start`` and
+    ``end`` dates, ``priority`` and ``min_priority``.
+    """
+    name = request.GET.get('format', 'csv')
+    if name not in export.FORMATS:
+        return HttpResponseBadRequest('format must be csv or ndjson')
+    try:
+        filters = export.parse_filters(request.GET)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    lines, content_type = export.FORMATS[name]
+    rows = export.iter_rows(
+        export.export_queryset(**filters),
+        getattr(settings, 'REQUEST_EXPORT_CHUNK', 2000))
+    response = StreamingHttpResponse(lines(rows), content_type=content_type)
+    response['Content-Disposition'] = \
+        'attachment; filename="requests.%s"' % name
+    return response
+
+
 @login_required
 def edit_person(request, pk):
     person = get_object_or_404(About, pk=pk)
@@ -41,6 +183,8 @@ def edit_person(request, pk):
         form = EditPersonForm(request.POST, request.FILES, instance=person)
         if form.is_valid():
             form.save()
+            if 'image' in form.changed_data:
+                images.process(person)
             if request.is_ajax():
                 return HttpResponse('OK')
         else:
@@ -59,15 +203,21 @@ def edit_person(request, pk):
 
 
 def request_list_priority(request):
-    requests_list = AllRequest.objects.order_by('-priority')
-    paginator = Paginator(requests_list, 10)
-    page = request.GET.get('page')
+    paginator = KeysetPaginator(AllRequest.objects.all(), 10,
+                                count=row_count(AllRequest))
     try:
-        requests = paginator.page(page)
-    except:
-        requests = paginator.page(1)
+        number = int(request.GET.get('page', 1))
+    except ValueError:
+        number = 1
+    try:
+        requests = paginator.page(after=request.GET.get('after'),
+                                  before=request.GET.get('before'),
+                                  last='last' in request.GET,
+                                  number=number, window=2)
+    except InvalidCursor:
+        requests = paginator.page(window=2)
     return render(request, 'hello/request_priority.html',
-                  {'requests': requests})
+                  {'requests': requests, 'next': request.get_full_path()})
 
 
 def edit_request(request, pk):
@@ -82,3 +232,62 @@ def edit_request(request, pk):
     return render(request, 'hello/edit_request.html', {'form': form,
                                                        'pk': pk,
                                                        'req': req})
+
+
+def bulk_priority_form(data):
+    """ BulkPriorityForm for POST data or a JSON object, ids as a list """
+    data = dict((key, data[key]) for key in data)
+    ids = data.get('ids')
+    if isinstance(ids, (list, tuple)):
+        data['ids'] = ','.join(map(unicode, ids))
+    return BulkPriorityForm(data)
+
+
+def apply_bulk_priority(form):
+    data = form.cleaned_data
+    return bulk.set_priority(data['priority'], ids=data['ids'],
+                             path=data['path'], method=data['method'])
+
+
+@login_required
+def bulk_request_priority(request):
+    """ Set the priority of checked requests or of a path/method """
+    updated = None
+    if request.method == "POST":
+        data = request.POST.copy()
+        data['ids'] = ','.join(request.POST.getlist('ids'))
+        form = bulk_priority_form(data)
+        if form.is_valid():
+            updated = apply_bulk_priority(form)
+            if is_safe_url(request.POST.get('next'), request.get_host()):
+                return HttpResponseRedirect(request.POST['next'])
+    else:
+        form = BulkPriorityForm()
+    return render(request, 'hello/bulk_priority.html', {'form': form,
+                                                        'updated': updated})
+
+
+@login_required
+def ajax_bulk_priority(request):
+    """ JSON API of bulk_request_priority
+
+    Takes a JSON object like {"priority": 5, "ids": [1, 2]} or
+    {"priority": 0, "path": "/static/", "method": "GET"} and answers with
+    the number of updated requests.
+    """
+    if request.method != "POST":
+        return HttpResponseBadRequest('POST a JSON object')
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest('POST a JSON object')
+    if not isinstance(data, dict):
+        return HttpResponseBadRequest('POST a JSON object')
+    form = bulk_priority_form(data)
+    if not form.is_valid():
+        errors_dict = dict((field, unicode(errors))
+                           for field, errors in form.errors.items())
+        return HttpResponseBadRequest(json.dumps(errors_dict),
+                                      content_type="application/json")
+    data = {'updated': apply_bulk_priority(form)}
+    return HttpResponse(json.dumps(data), content_type="application/json")
@@ -0,0 +1,230 @@
+import atexit
+import logging
+import threading
+import time
+from Queue import Queue, Empty, Full
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, reset_queries, transaction
+
+from . import counts
+from .instrumentation import uncounted
+from .models import AllRequest, SignalData
+
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('drop', 'sample', 'block')
+
+_STOP = object()
+
+
+class BufferedWriter(object):
+    """ Writes unsaved model instances with bulk_create from a thread
+
+    Rows go through a bounded queue to a writer thread that flushes them
+    every ``size`` rows or every ``interval`` milliseconds, whichever comes
+    first, so callers never wait for the database. A ``size`` of 1 writes
+    every row straight away on the calling thread.
+
+    When the queue is full ``overflow`` decides what happens: ``drop``
+    discards the row, ``block`` waits up to ``block_timeout`` seconds for
+    room and then drops it, and ``sample`` keeps only every
+    ``sample_rate``-th row once the queue is half full. A batch that can't
+    be written, whatever the error, is logged and counted as dropped.
+
+    With ``threaded=False`` no writer thread is started and rows are only
+    written by ``flush``. Callables in ``listeners`` are called with every
+    batch once it is written. With ``fetch_ids=True`` the rows get their
+    primary keys set before that, which bulk_create doesn't do. Callables
+    in ``before_write`` are called with every batch in its transaction
+    before it is inserted, each in a savepoint: one that fails is rolled
+    back and the batch is written without it.
+    """
+
+    def __init__(self, model, size, interval, queue_size=10000,
+                 overflow='drop', sample_rate=10, threaded=True,
+                 fetch_ids=False, block_timeout=5):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ImproperlyConfigured('Unknown overflow policy %r, use one '
+                                       'of %s' % (overflow,
+                                                  OVERFLOW_POLICIES))
+        self.model = model
+        self.size = size
+        self.interval = interval
+        self.overflow = overflow
+        self.sample_rate = sample_rate
+        self.block_timeout = block_timeout
+        self.threaded = threaded
+        self.fetch_ids = fetch_ids
+        self.listeners = []
+        self.before_write = []
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self._queue = Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._seen = 0
+
+    def add(self, row):
+        if self.size <= 1:
+            self._count('enqueued', 1)
+            # the writer thread would do this, don't bill the view for it
+            with uncounted():
+                self._write([row])
+            return
+        if self.threaded and not self._running():
+            self._start()
+        if self._accept():
+            try:
+                self._queue.put(row, block=self.overflow == 'block',
+                                timeout=self.block_timeout)
+            except Full:
+                self._count('dropped', 1)
+                return
+            self._count('enqueued', 1)
+        else:
+            self._count('dropped', 1)
+
+    def flush(self):
+        """ Write everything queued so far on the calling thread """
+        rows = []
+        while True:
+            try:
+                row = self._queue.get_nowait()
+            except Empty:
+                break
+            if row is not _STOP:
+                rows.append(row)
+        if rows:
+            self._write(rows)
+
+    def stop(self):
+        """ Stop the writer thread and write what is left """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+        self.flush()
+
+    def stats(self):
+        return {'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'queued': self._queue.qsize()}
+
+    def _accept(self):
+        if self.overflow != 'sample':
+            return True
+        if self._queue.qsize() * 2 < self._queue.maxsize:
+            return True
+        with self._lock:
+            self._seen += 1
+            return self._seen % self.sample_rate == 0
+
+    def _count(self, name, value):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def _running(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def _start(self):
+        with self._lock:
+            if self._running():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name='%s-writer' % self.model.__name__)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            rows = []
+            row = self._queue.get()
+            deadline = time.time() + self.interval / 1000.0
+            while row is not _STOP:
+                rows.append(row)
+                timeout = deadline - time.time()
+                if len(rows) >= self.size or timeout <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=timeout)
+                except Empty:
+                    break
+            if rows:
+                self._write(rows)
+                # request_started, which clears the query log DEBUG keeps,
+                # never fires on this thread
+                reset_queries()
+            if row is _STOP:
+                return
+
+    def _write(self, rows):
+        try:
+            with transaction.atomic():
+                self._prepare(rows)
+                self.model.objects.bulk_create(rows)
+                counts.add(self.model, len(rows))
+                if self.fetch_ids:
+                    self._fetch_ids(rows)
+        except Exception:
+            # the writer thread has to outlive any batch
+            logger.exception('Lost %d %s rows', len(rows),
+                             self.model.__name__)
+            self._count('dropped', len(rows))
+        else:
+            self._count('written', len(rows))
+            for listener in self.listeners:
+                try:
+                    listener(rows)
+                except Exception:
+                    logger.exception('%s listener %r failed',
+                                     self.model.__name__, listener)
+
+    def _prepare(self, rows):
+        for hook in self.before_write:
+            try:
+                with transaction.atomic():
+                    hook(rows)
+            except Exception:
+                logger.exception('%s hook %r failed', self.model.__name__,
+                                 hook)
+
+    def _fetch_ids(self, rows):
+        # SQLite holds the write lock until the transaction ends, so the
+        # batch got the ids right below the current maximum
+        if connection.vendor != 'sqlite':
+            return
+        last = self.model.objects.order_by('-pk').values_list(
+            'pk', flat=True).first()
+        if last is None:
+            return
+        for offset, row in enumerate(reversed(rows)):
+            row.pk = last - offset
+
+
+request_writer = BufferedWriter(
+    AllRequest,
+    size=getattr(settings, 'REQUEST_LOG_BUFFER_SIZE', 100),
+    interval=getattr(settings, 'REQUEST_LOG_FLUSH_INTERVAL', 500),
+    queue_size=getattr(settings, 'REQUEST_LOG_QUEUE_SIZE', 10000),
+    overflow=getattr(settings, 'REQUEST_LOG_OVERFLOW', 'drop'),
+    sample_rate=getattr(settings, 'REQUEST_LOG_SAMPLE_RATE', 10),
+    fetch_ids=True,
+    block_timeout=getattr(settings, 'REQUEST_LOG_BLOCK_TIMEOUT', 5))
+
+atexit.register(request_writer.stop)
+
+audit_writer = BufferedWriter(
+    SignalData,
+    size=getattr(settings, 'AUDIT_LOG_BUFFER_SIZE', 100),
+    interval=getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 1000),
+    overflow=getattr(settings, 'AUDIT_LOG_OVERFLOW', 'block'),
+    block_timeout=getattr(settings, 'AUDIT_LOG_BLOCK_TIMEOUT', 5))
+
+atexit.register(audit_writer.stop)
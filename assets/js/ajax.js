@@ -3,72 +3,99 @@ $(document).ready(function(){
     $.cookie('watched', 'no');
     $.cookie('n', 0);
 
-    setTimeout(function (){
+    var limit = 10;
 
-        function load_post() {
-            
-            var number1 = +$('p.number:first').text();
+    function cell(content) {
+        return $('<td align="center" valign="middle">').append(content);
+    }
 
-            $.ajax({
-                type : "GET",
-                url:"ajax_request_list",
-                dataType:"json",
-                success:function(data){
-                    
-                    var all_requests = $('#all_requests');
-                    all_requests.empty();
+    function render_row(value) {
+        var edit = $('<a>').attr('href', '../edit_request/' + value.req_id).text('Edit');
+        return $('<tr>')
+            .append(cell([$('<p>').text('[' + value.req_date + ']'),
+                          $('<p class="number">').text(value.req_id)]))
+            .append(cell($('<p>').text(value.req_method)))
+            .append(cell($('<p>').text(value.req_path)))
+            .append(cell($('<p>').text(value.req_priority)))
+            .append(cell($('<p>').append(edit)));
+    }
 
-                    $.each(data, function(key, value){
-                        var html = '<tr>';
-                        html += '<td align="center" valign="middle"><p>[' + value.req_date + ']</p><p class="number">' + value.req_id + '</p></td>';
-                        html += '<td align="center" valign="middle"><p>' + value.req_method + '</p></td>';
-                        html += '<td align="center" valign="middle"><p>' + value.req_path + '</p></td>';
-                        html += '<td align="center" valign="middle"><p>' + value.req_priority + '</p></td>';
-                        html += '<td align="center" valign="middle"><p><a href="../edit_request/' + value.req_id + '">Edit</a></p></td>';
-                        html += '</tr>';
-                        all_requests.append(html);
-                    });
+    function show(data) {
+        var all_requests = $('#all_requests');
+        $.each(data.slice().reverse(), function(key, value){
+            all_requests.prepend(render_row(value));
+        });
+        all_requests.children('tr').slice(limit).remove();
 
-                    var watched = $.cookie('watched');
-                    var number2 = +$('p.number:first').text();
-                    var n = number2 - number1;
-                    var past_n = +$.cookie('n');
+        var watched = $.cookie('watched');
+        var n = data.length;
+        var past_n = +$.cookie('n');
 
-                    if (n > 0 || past_n > 0) {
-                        
-                        if (watched === 'no') {
-                            n += past_n;
-                        } 
-                        $('title').text(n + ' new request(s)');
-                        $.cookie('n', n);
-                        $.cookie('watched', 'no')
-                    } else {
-                        $('title').text('Last 10 requests');
-                    }
+        if (n > 0 || past_n > 0) {
 
-                }
-            });
-        
-            $('html').click(function() {
-                if ( $(window).height() === $(document).height()) {
-                        $.cookie('watched', 'yes');
-                        $.cookie('n', 0);
-                        $('title').text('Last 10 requests');
-                } 
-            });
+            if (watched === 'no') {
+                n += past_n;
+            }
+            $('title').text(n + ' new request(s)');
+            $.cookie('n', n);
+            $.cookie('watched', 'no')
+        } else {
+            $('title').text('Last 10 requests');
+        }
+    }
+
+    // Long poll: the server answers as soon as there are new requests,
+    // plain polling with ETags is the fallback when that fails
+    function wait_post() {
+        $.ajax({
+            type : "GET",
+            url:"ajax_request_wait",
+            data: {since: +$('p.number:first').text()},
+            dataType:"json",
+            success:function(data){
+                show(data);
+                wait_post();
+            },
+            error:function(){
+                setTimeout(load_post, 5000);
+            }
+        });
+    }
+
+    function load_post() {
+        var since = +$('p.number:first').text();
+
+        $.ajax({
+            type : "GET",
+            url:"ajax_request_list",
+            data: since ? {since: since} : {},
+            ifModified: true,
+            dataType:"json",
+            complete:function(){
+                setTimeout(wait_post, 5000);
+            },
+            success:function(data, status){
+                show(status === 'notmodified' || !data ? [] : data);
+            }
+        });
+    }
+
+    $('html').click(function() {
+        if ( $(window).height() === $(document).height()) {
+                $.cookie('watched', 'yes');
+                $.cookie('n', 0);
+                $('title').text('Last 10 requests');
+        }
+    });
 
-            $(window).scroll(function() {
-                if($(window).scrollTop() + $(window).height() >= $(document).height() - 50 ) {
-                    $.cookie('watched', 'yes');
-                    $.cookie('n', 0);
-                    $('title').text('Last 10 requests');         
-                }  
-            });
+    $(window).scroll(function() {
+        if($(window).scrollTop() + $(window).height() >= $(document).height() - 50 ) {
+            $.cookie('watched', 'yes');
+            $.cookie('n', 0);
+            $('title').text('Last 10 requests');
         }
-        
-        load_post();
+    });
 
-        setInterval(load_post, 5000);
-    },2000);
+    setTimeout(wait_post, 2000);
 
 });
@@ -4,3 +4,8 @@ try:
     from .local import *
 except ImportError:
     pass
+
+if not TEMPLATE_DEBUG and not isinstance(TEMPLATE_LOADERS[0], tuple):
+    TEMPLATE_LOADERS = (
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    )
@@ -47,6 +47,7 @@ INSTALLED_APPS = (
 )
 
 MIDDLEWARE_CLASSES = (
+    'apps.hello.middleware.ViewStatsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -127,7 +128,199 @@ TEMPLATE_DIRS = (
     os.path.join(BASE_DIR, 'templates'),
 )
 
+TEMPLATE_LOADERS = (
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+)
+
+# Production template mode: with TEMPLATE_DEBUG off (in local.py) the
+# loaders above are wrapped in the cached loader, so every template is
+# compiled once per process. See settings/__init__.py.
+
+# Cache
+# https://docs.djangoproject.com/en/1.6/topics/cache/
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fortytwo',
+    },
+    'files': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+}
+
+# Cache backends used by apps.hello.caching.cache_view and the
+# cachefragment template tag. Entries are dropped as soon as a model they
+# depend on is saved or deleted. The model generations that tell are kept
+# in the same backends, so with several server processes use a shared
+# one (memcached, files): locmem only invalidates its own process. The
+# compiled priority rules of every process follow the generation of
+# PriorityRule in VIEW_CACHE_BACKEND the same way, and the ETag of the
+# live request feed is kept there too.
+VIEW_CACHE_BACKEND = 'default'
+FRAGMENT_CACHE_BACKEND = 'default'
+
+# JSON modules tried in order for the request feed responses, the first
+# one installed is used. ujson is optional and several times faster.
+JSON_BACKENDS = ('ujson', 'json')
+
+# Rendered rows of the request tables are kept in FRAGMENT_CACHE_BACKEND
+# per request and priority, for this many seconds.
+REQUEST_ROW_CACHE_TIMEOUT = 86400
+
 # Turn off south during test
 SOUTH_TESTS_MIGRATE = False
 
 LOGIN_REDIRECT_URL = '/'
+
+# Request logging
+# RequestMiddleware writes AllRequest rows in batches of
+# REQUEST_LOG_BUFFER_SIZE rows or every REQUEST_LOG_FLUSH_INTERVAL
+# milliseconds from a background thread.
+REQUEST_LOG_BUFFER_SIZE = 100
+REQUEST_LOG_FLUSH_INTERVAL = 500
+# Rows wait for the writer thread in a queue of REQUEST_LOG_QUEUE_SIZE
+# entries. REQUEST_LOG_OVERFLOW says what to do once it is full: 'drop'
+# the row, 'block' the request until there is room, for at most
+# REQUEST_LOG_BLOCK_TIMEOUT seconds, or 'sample' which keeps every
+# REQUEST_LOG_SAMPLE_RATE-th row once the queue is half full. The counts
+# of queued, written and dropped rows are shown at /request/stats/writers.
+REQUEST_LOG_QUEUE_SIZE = 10000
+REQUEST_LOG_OVERFLOW = 'drop'
+REQUEST_LOG_SAMPLE_RATE = 10
+REQUEST_LOG_BLOCK_TIMEOUT = 5
+# Which requests are recorded at all. Patterns are path prefixes, or
+# regular expressions when they start with '^'. REQUEST_LOG_SAMPLE_RATES
+# maps a path or a prefix ending with '/' to the share of its requests
+# to keep, REQUEST_LOG_METHOD_RATES does the same per HTTP method.
+REQUEST_LOG_INCLUDE = ()
+REQUEST_LOG_EXCLUDE = (
+    '/request/ajax_request_list',
+    '/request/ajax_request_wait',
+    '/request/analytics/',
+    '/request/stats/',
+    '/favicon.ico',
+    STATIC_URL,
+    MEDIA_URL,
+    '^/admin/jsi18n/$',
+)
+REQUEST_LOG_SAMPLE_RATES = {}
+REQUEST_LOG_METHOD_RATES = {
+    'HEAD': 0,
+    'OPTIONS': 0,
+}
+
+# The newest REQUEST_FEED_SIZE requests are kept in memory for the last
+# requests page and the live feed. Its long poll waits at most
+# REQUEST_FEED_TIMEOUT seconds for new requests, and looks for requests
+# recorded by other server processes every REQUEST_FEED_CHECK_INTERVAL
+# seconds. Other processes are seen through VIEW_CACHE_BACKEND, so it
+# has to be shared between them.
+REQUEST_FEED_SIZE = 100
+REQUEST_FEED_TIMEOUT = 25
+REQUEST_FEED_CHECK_INTERVAL = 1
+
+# Exports of the request log read this many rows per query, imports
+# insert this many per transaction
+REQUEST_EXPORT_CHUNK = 2000
+REQUEST_IMPORT_CHUNK = 5000
+
+# Request stats
+# With REQUEST_STATS_LIVE every written batch of requests is counted into
+# the per-minute and per-hour stats the analytics views read. Ranges up
+# to REQUEST_ANALYTICS_MINUTE_RANGE minutes are answered from the minute
+# stats, longer ones from the hour stats. The views accept ranges of up to
+# REQUEST_ANALYTICS_MAX_MINUTES and top lists of up to
+# REQUEST_ANALYTICS_MAX_LIMIT values.
+REQUEST_STATS_LIVE = True
+REQUEST_ANALYTICS_MINUTE_RANGE = 24 * 60
+REQUEST_ANALYTICS_MAX_MINUTES = 366 * 24 * 60
+REQUEST_ANALYTICS_MAX_LIMIT = 1000
+
+# Request log retention
+# manage.py compact_requests deletes requests older than
+# REQUEST_RETENTION_DAYS REQUEST_RETENTION_CHUNK rows at a time, copying
+# them to monthly archive tables first if REQUEST_RETENTION_ARCHIVE is
+# set. Rows that weren't counted when they were recorded are rolled into
+# the stats first. Minute stats older than REQUEST_STATS_MINUTE_DAYS are
+# deleted too, the hour stats answer for older ranges. Archive tables are
+# created with CREATE TABLE IF NOT EXISTS, which SQLite, MySQL and
+# PostgreSQL 9.1 or later support. Set REQUEST_RETENTION_INTERVAL to a
+# number of seconds to also run it from a background thread of every
+# server process.
+REQUEST_RETENTION_DAYS = 30
+REQUEST_RETENTION_CHUNK = 1000
+REQUEST_RETENTION_ARCHIVE = False
+REQUEST_RETENTION_INTERVAL = None
+REQUEST_STATS_MINUTE_DAYS = 7
+
+# View stats
+# ViewStatsMiddleware keeps time and query histograms per URL name, shown
+# at /request/stats/views. A view that runs more queries than its
+# VIEW_QUERY_BUDGETS entry logs a warning, or raises with
+# VIEW_QUERY_BUDGETS_STRICT. Queries of the middleware before the view
+# and of synchronous log writers don't count.
+# The budgets are the most queries each view ran in the test suite, with
+# a little room: a cold row counter on request_priority and the inline
+# rendition swap of an upload on edit are the worst cases.
+VIEW_QUERY_BUDGETS = {
+    'about': 5,
+    'request_list': 3,
+    'request_priority': 12,
+    'edit_request': 4,
+    'edit': 15,
+    'ajax_list': 3,
+    'ajax_wait': 3,
+    'analytics_top': 2,
+    'analytics_rate': 2,
+    'export_requests': 4,
+}
+VIEW_QUERY_BUDGETS_STRICT = False
+
+# Performance tests
+# apps.hello.tests.PerformanceTest seeds AllRequest with
+# PERFORMANCE_TEST_ROWS rows and compares view timings with the ones
+# PERFORMANCE_BASELINE holds for that many rows. Both can be set from
+# the environment, see `make perftest`; PERFORMANCE_BASELINE_WRITE=1
+# records the measured timings instead of checking them.
+PERFORMANCE_TEST_ROWS = int(os.environ.get('PERFORMANCE_TEST_ROWS', 1000))
+PERFORMANCE_BASELINE = os.environ.get(
+    'PERFORMANCE_BASELINE',
+    os.path.join(BASE_DIR, 'apps', 'hello', 'performance.json'))
+PERFORMANCE_BASELINE_WRITE = bool(os.environ.get('PERFORMANCE_BASELINE_WRITE'))
+
+# Audit log
+# Saves and deletes of the models registered in apps.hello.signals are
+# logged into SignalData by a writer like the request log one.
+AUDIT_LOG_BUFFER_SIZE = 100
+AUDIT_LOG_FLUSH_INTERVAL = 1000
+AUDIT_LOG_OVERFLOW = 'block'
+AUDIT_LOG_BLOCK_TIMEOUT = 5
+
+# Profile photos
+# Uploads are kept as originals and IMAGE_WORKERS processes render square
+# PROFILE_IMAGE_SIZES renditions in every PROFILE_IMAGE_FORMATS format
+# Pillow can write. The smallest JPEG is shown until a template asks for
+# the others. 0 workers renders them during the upload request.
+PROFILE_IMAGE_SIZES = (200, 400, 800)
+PROFILE_IMAGE_FORMATS = ('JPEG', 'WEBP')
+PROFILE_IMAGE_QUALITY = 90
+IMAGE_WORKERS = 2
+
+# Photos without worker renditions get the same sizes from the imagekit
+# specs in apps.hello.imagegenerators, generated on first view. Their
+# files are named after a hash of source and spec, and the file cache
+# remembers which exist, so they are only ever made once.
+IMAGEKIT_SPEC_CACHEFILE_NAMER = 'imagekit.cachefiles.namers.hash'
+IMAGEKIT_CACHE_BACKEND = 'files'
+
+# Tests run against an in-memory database that the writer threads
+# can't see, so write everything synchronously there. A view over its
+# query budget fails the test that requested it.
+if 'test' in sys.argv:
+    REQUEST_LOG_BUFFER_SIZE = 1
+    AUDIT_LOG_BUFFER_SIZE = 1
+    IMAGE_WORKERS = 0
+    IMAGEKIT_CACHE_BACKEND = 'default'
+    VIEW_QUERY_BUDGETS_STRICT = True